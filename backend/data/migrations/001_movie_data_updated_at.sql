@@ -0,0 +1,22 @@
+-- Stamps movie_data rows with the server time of every insert and update, so
+-- delta refreshes of the movie catalog never depend on scraper clocks
+alter table movie_data add column if not exists updated_at timestamptz;
+update movie_data set updated_at = now() where updated_at is null;
+alter table movie_data
+    alter column updated_at set default now(),
+    alter column updated_at set not null;
+
+create or replace function set_movie_data_updated_at() returns trigger as $$
+begin
+    new.updated_at = now();
+    return new;
+end;
+$$ language plpgsql;
+
+drop trigger if exists movie_data_updated_at on movie_data;
+create trigger movie_data_updated_at
+    before insert or update on movie_data
+    for each row execute function set_movie_data_updated_at();
+
+-- Serves the delta query of catalog refreshes
+create index if not exists movie_data_updated_at_idx on movie_data (updated_at);
@@ -0,0 +1,158 @@
+import numpy as np
+import os
+import pandas as pd
+import pyarrow as pa
+import sys
+from typing import Dict, Sequence
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(project_root)
+
+BINARY_COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+
+# Postgres type and big-endian wire format of each numeric column dtype
+POSTGRES_TYPES = {
+    "bool": ("bool", "?"),
+    "int16": ("int2", ">i2"),
+    "int32": ("int4", ">i4"),
+    "int64": ("int8", ">i8"),
+    "float32": ("float4", ">f4"),
+    "float64": ("float8", ">f8"),
+    "timestamp": ("float8", ">f8"),
+}
+
+
+class BinaryCopyBuffer:
+    """
+    Collects the raw output of a binary COPY.
+    """
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+
+    def write(self, chunk: bytes) -> int:
+        self.data += chunk
+
+        return len(chunk)
+
+
+def get_numeric_selection(name: str, dtype: str) -> str:
+    """
+    Gets the SQL expression that copies a numeric column at a fixed width.
+    """
+    postgres_type, _ = POSTGRES_TYPES[dtype]
+    if dtype == "timestamp":
+        return f"COALESCE(EXTRACT(EPOCH FROM {name}), 'NaN')::float8"
+    elif dtype.startswith("float"):
+        return f"COALESCE({name}, 'NaN')::{postgres_type}"
+    else:
+        return f"{name}::{postgres_type}"
+
+
+def get_binary_copy_queries(
+    table: str,
+    columns: Dict[str, str],
+    order_by: str,
+    where: str | None = None,
+) -> Sequence[str]:
+    """
+    Gets the binary COPY queries that load a table column by column. The first
+    query copies the numeric columns and string lengths as fixed-width rows, and
+    each following query copies one string column as a single concatenated value.
+    """
+    condition = f" WHERE {where}" if where else ""
+
+    selection = [
+        get_numeric_selection(name=name, dtype=dtype)
+        for name, dtype in columns.items()
+        if dtype != "string"
+    ] + [
+        f"COALESCE(octet_length({name}), -1)::int4"
+        for name, dtype in columns.items()
+        if dtype == "string"
+    ]
+    queries = [
+        f"COPY (SELECT {', '.join(selection)} FROM {table}{condition} "
+        f"ORDER BY {order_by}) TO STDOUT (FORMAT binary)"
+    ]
+    for name, dtype in columns.items():
+        if dtype == "string":
+            queries.append(
+                f"COPY (SELECT string_agg({name}, '' ORDER BY {order_by}) "
+                f"FROM {table}{condition}) TO STDOUT (FORMAT binary)"
+            )
+
+    return queries
+
+
+def get_binary_copy_body(data: bytes | bytearray) -> memoryview:
+    """
+    Strips the header and trailer from binary COPY output.
+    """
+    view = memoryview(data)
+    if bytes(view[:11]) != BINARY_COPY_SIGNATURE:
+        raise ValueError("Invalid binary COPY signature")
+    extension_length = int.from_bytes(view[15:19], "big")
+
+    return view[19 + extension_length : len(view) - 2]
+
+
+def decode_binary_copy_rows(
+    data: bytes | bytearray, dtypes: Dict[str, str]
+) -> Dict[str, np.ndarray]:
+    """
+    Decodes fixed-width binary COPY rows into typed NumPy columns.
+    """
+    body = get_binary_copy_body(data=data)
+
+    # Views every row as a packed record
+    fields = [("num_fields", ">i2")]
+    for name, dtype in dtypes.items():
+        fields.append((f"{name}_length", ">i4"))
+        fields.append((name, POSTGRES_TYPES[dtype][1]))
+    row_dtype = np.dtype(fields)
+    if len(body) % row_dtype.itemsize != 0:
+        raise ValueError("Binary COPY rows are not fixed-width")
+    rows = np.frombuffer(body, dtype=row_dtype)
+
+    # Converts each field to a native column
+    columns = {}
+    for name, dtype in dtypes.items():
+        if (rows[f"{name}_length"] != rows.dtype[name].itemsize).any():
+            raise ValueError(f"Column {name} contains null values")
+        if dtype == "timestamp":
+            columns[name] = pd.to_datetime(
+                rows[name].astype("float64"), unit="s", utc=True
+            )
+        else:
+            columns[name] = rows[name].astype(dtype)
+
+    return columns
+
+
+def decode_binary_copy_value(data: bytes | bytearray) -> memoryview:
+    """
+    Decodes the value of a single-row, single-column binary COPY.
+    """
+    body = get_binary_copy_body(data=data)
+    length = int.from_bytes(body[2:6], "big", signed=True)
+
+    return body[6 : 6 + max(length, 0)]
+
+
+def build_string_array(lengths: np.ndarray, data: bytes | memoryview) -> pa.Array:
+    """
+    Builds an Arrow string array from value lengths and concatenated values.
+    """
+    is_valid = lengths >= 0
+    offsets = np.zeros(len(lengths) + 1, dtype="int64")
+    np.cumsum(np.where(is_valid, lengths, 0), out=offsets[1:])
+    null_bitmap = None if is_valid.all() else pa.array(is_valid).buffers()[1]
+
+    return pa.LargeStringArray.from_buffers(
+        len(lengths),
+        pa.py_buffer(offsets),
+        pa.py_buffer(data),
+        null_bitmap,
+        int((~is_valid).sum()),
+    )
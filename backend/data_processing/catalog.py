@@ -0,0 +1,672 @@
+from dotenv import load_dotenv
+import hashlib
+import numpy as np
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from sklearn.base import BaseEstimator
+import sys
+import threading
+import time
+from typing import Dict, Sequence, Tuple
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(project_root)
+
+from data_processing import database
+from data_processing.utils import FEATURE_COLUMNS, GENRES
+from infra.cpu_budget import release_threads, reserve_threads, run_with_threads
+from infra.warmup import is_preloaded
+from model.model_cache import get_shared_scores
+
+load_dotenv()
+
+CATALOG_SNAPSHOT_PATH = os.getenv(
+    "MOVIE_CATALOG_PATH", "./data/catalog/movie_catalog.arrow"
+)
+
+# Seconds between checks for a snapshot refreshed by another worker
+CATALOG_WATCH_INTERVAL = int(os.getenv("MOVIE_CATALOG_WATCH_INTERVAL", 30))
+
+# Seconds of movie data updates re-read before the catalog version, so upserts
+# that commit after a later update was read are still pulled
+CATALOG_DELTA_MARGIN = int(os.getenv("MOVIE_CATALOG_DELTA_MARGIN", 600))
+
+# Numeric columns with a sorted range index
+RANGE_INDEX_COLUMNS = [
+    "release_year",
+    "runtime",
+    "letterboxd_rating",
+    "letterboxd_rating_count",
+]
+
+# Inclusive letterboxd_rating_count bounds of each popularity bucket
+POPULARITY_BUCKETS = {
+    "low": (None, 25000),
+    "medium": (25001, 100000),
+    "high": (100001, None),
+}
+
+# Storage type of each catalog column
+CATALOG_SCHEMA = pa.schema(
+    [
+        ("movie_id", pa.int32()),
+        ("url", pa.large_string()),
+        ("title", pa.large_string()),
+        ("content_type", pa.large_string()),
+        ("release_year", pa.int16()),
+        ("runtime", pa.int16()),
+        ("letterboxd_rating", pa.float64()),
+        ("letterboxd_rating_count", pa.int32()),
+        ("genres", pa.int32()),
+        ("country_of_origin", pa.int8()),
+        ("poster", pa.large_string()),
+    ]
+    + [(f"is_{genre}", pa.int8()) for genre in GENRES]
+    + [("features", pa.list_(pa.float32(), len(FEATURE_COLUMNS)))]
+)
+
+
+class MovieCatalog:
+    """
+    Read-only, columnar movie catalog backed by a memory-mapped snapshot.
+    """
+
+    def __init__(self, table: pa.Table, snapshot_mtime: int | None = None) -> None:
+        self.table = table
+        self.frame = catalog_table_to_frame(table=table)
+        self.frame["row_id"] = np.arange(len(self.frame), dtype="int32")
+
+        # Id shared by catalog rows with the same title, release year, and runtime
+        self.frame["canonical_id"] = (
+            self.frame.groupby(
+                ["title", "release_year", "runtime"], sort=False, dropna=False
+            )
+            .ngroup()
+            .astype("int32")
+        )
+        self.num_canonical_ids = (
+            int(self.frame["canonical_id"].to_numpy().max(initial=-1)) + 1
+        )
+        self.snapshot_mtime = snapshot_mtime
+
+        # Model features of every movie, one row per catalog row
+        features = table.column("features").combine_chunks().flatten()
+        self.features = features.to_numpy(zero_copy_only=True).reshape(
+            -1, len(FEATURE_COLUMNS)
+        )
+
+        # Row id of each movie_id, or -1 for movie_ids not in the catalog
+        movie_ids = self.frame["movie_id"].to_numpy()
+        self.movie_id_rows = np.full(
+            int(movie_ids.max(initial=-1)) + 1, -1, dtype="int32"
+        )
+        self.movie_id_rows[movie_ids] = self.frame["row_id"].to_numpy()
+
+        # Row id of each url
+        self.url_rows = dict(
+            zip(self.frame["url"].to_numpy(dtype=object), range(len(self.frame)))
+        )
+
+        # Row ids of each range index column, ordered by value
+        self.range_indexes = {}
+        for column in RANGE_INDEX_COLUMNS:
+            values = self.frame[column].to_numpy()
+            order = np.argsort(values, kind="stable").astype("int32")
+            num_valid = len(values) - int(pd.isna(values).sum())
+            self.range_indexes[column] = (order, values[order], num_valid)
+
+        # Bitmap of the rows in each popularity bucket
+        self.popularity_bitmaps = {
+            bucket: self.get_range_mask(
+                column="letterboxd_rating_count", low=low, high=high
+            )
+            for bucket, (low, high) in POPULARITY_BUCKETS.items()
+        }
+
+        # General model score of every movie by model version, predicted on
+        # first use
+        self.general_scores: Dict[str, np.ndarray] = {}
+
+        # Latest movie data update included in the catalog
+        metadata = table.schema.metadata or {}
+        updated_at = metadata.get(b"updated_at")
+        self.updated_at = updated_at.decode() if updated_at else None
+
+        # Id of the catalog's contents, changed by every refresh
+        self.version = hashlib.sha256(
+            f"{self.updated_at}-{snapshot_mtime}".encode()
+        ).hexdigest()[:16]
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    def get_rows_by_movie_id(self, movie_ids: Sequence[int]) -> np.ndarray:
+        """
+        Gets the row id of each movie_id, or -1 for movie_ids not in the catalog.
+        """
+        movie_ids = np.asarray(movie_ids, dtype="int64")
+        is_valid = (movie_ids >= 0) & (movie_ids < len(self.movie_id_rows))
+        rows = np.full(len(movie_ids), -1, dtype="int32")
+        rows[is_valid] = self.movie_id_rows[movie_ids[is_valid]]
+
+        return rows
+
+    def get_rows_by_url(self, urls: Sequence[str | None]) -> np.ndarray:
+        """
+        Gets the row id of each url, or -1 for urls not in the catalog.
+        """
+        return np.fromiter(
+            (self.url_rows.get(url, -1) for url in urls), dtype="int32", count=len(urls)
+        )
+
+    def get_range_rows(
+        self, column: str, low: float | None = None, high: float | None = None
+    ) -> np.ndarray:
+        """
+        Gets the row ids with a value within inclusive bounds, ordered by value.
+        Missing values never match.
+        """
+        order, sorted_values, num_valid = self.range_indexes[column]
+        sorted_values = sorted_values[:num_valid]
+
+        start = 0 if low is None else np.searchsorted(sorted_values, low, "left")
+        end = (
+            num_valid if high is None else np.searchsorted(sorted_values, high, "right")
+        )
+
+        return order[start:end]
+
+    def get_range_mask(
+        self, column: str, low: float | None = None, high: float | None = None
+    ) -> np.ndarray:
+        """
+        Gets a bitmap of the rows with a value within inclusive bounds.
+        """
+        mask = np.zeros(len(self), dtype="bool")
+        mask[self.get_range_rows(column=column, low=low, high=high)] = True
+
+        return mask
+
+    def get_filtered_rows(
+        self,
+        ranges: Dict[str, Tuple[float | None, float | None]],
+        popularity: Sequence[str] | None = None,
+    ) -> np.ndarray:
+        """
+        Gets the sorted row ids matching every range filter and any of the
+        popularity buckets.
+        """
+        # Starts from the most selective range
+        candidates = {
+            column: self.get_range_rows(column=column, low=low, high=high)
+            for column, (low, high) in ranges.items()
+        }
+        selective = min(candidates, key=lambda column: len(candidates[column]))
+        rows = np.sort(candidates[selective])
+
+        # Intersects with the other ranges
+        for column, (low, high) in ranges.items():
+            if column != selective:
+                values = self.frame[column].to_numpy()[rows]
+                is_match = ~pd.isna(values)
+                if low is not None:
+                    is_match &= values >= low
+                if high is not None:
+                    is_match &= values <= high
+                rows = rows[is_match]
+
+        # Intersects with the popularity buckets
+        if popularity is not None:
+            bitmap = np.zeros(len(self), dtype="bool")
+            for bucket in popularity:
+                if bucket in self.popularity_bitmaps:
+                    bitmap |= self.popularity_bitmaps[bucket]
+            rows = rows[bitmap[rows]]
+
+        return rows
+
+    def get_general_scores(self) -> np.ndarray:
+        """
+        Gets the served general model's predicted rating of every movie.
+        """
+        from model.general_model import get_versioned_general_model
+
+        version, model = get_versioned_general_model()
+
+        return self.score_general_model(version=version, model=model)
+
+    def score_general_model(self, version: str, model: BaseEstimator) -> np.ndarray:
+        """
+        Gets a general model's predicted rating of every movie. The general model
+        only uses catalog features, so scores are predicted once per catalog and
+        model version rather than once per request. Scores of a snapshot are
+        predicted by one worker process and memory-mapped by the others.
+        """
+        scores = self.general_scores.get(version)
+        if scores is None:
+            with _general_scores_lock:
+                scores = self.general_scores.get(version)
+                if scores is None:
+                    if self.snapshot_mtime is None:
+                        scores = self.predict_general_scores(
+                            version=version, model=model
+                        )
+                    else:
+                        scores = get_shared_scores(
+                            key=f"general-{version}-{self.version}",
+                            score=lambda: self.predict_general_scores(
+                                version=version, model=model
+                            ),
+                        )
+
+                    # Keeps the scores of the served and next model versions
+                    self.general_scores[version] = scores
+                    while len(self.general_scores) > 2:
+                        self.general_scores.pop(next(iter(self.general_scores)))
+
+        return scores
+
+    def predict_general_scores(self, version: str, model: BaseEstimator) -> np.ndarray:
+        """
+        Predicts a general model's rating of every movie with a share of the CPU
+        budget.
+        """
+        start = time.perf_counter()
+
+        threads = reserve_threads()
+        try:
+            scores = run_with_threads(
+                threads,
+                model.predict,
+                self.get_features(row_ids=np.arange(len(self))),
+            )
+        finally:
+            release_threads(threads=threads)
+
+        finish = time.perf_counter()
+        print(
+            f"Scored {len(self)} movies with general model {version} "
+            f"in {finish - start} seconds"
+        )
+
+        return scores
+
+    def get_features(self, row_ids: np.ndarray | pd.Series) -> pd.DataFrame:
+        """
+        Gathers the model features of catalog rows.
+        """
+        return pd.DataFrame(
+            self.features[np.asarray(row_ids)], columns=FEATURE_COLUMNS, copy=False
+        )
+
+
+def build_catalog_table(movie_data: pd.DataFrame) -> pa.Table:
+    """
+    Builds the typed catalog table from raw movie data.
+    """
+    # Decodes genres
+    genre_flags = decode_genres(genres=movie_data["genres"].to_numpy(dtype="int32"))
+
+    # Stores each column as a typed array
+    arrays = []
+    for field in CATALOG_SCHEMA:
+        if field.name == "features":
+            continue
+        elif field.name.startswith("is_"):
+            arrays.append(pa.array(genre_flags[:, GENRES.index(field.name[3:])]))
+        elif pa.types.is_large_string(field.type):
+            arrays.append(
+                pa.array(movie_data[field.name], type=field.type, from_pandas=True)
+            )
+        else:
+            arrays.append(
+                pa.array(
+                    movie_data[field.name].to_numpy(dtype=field.type.to_pandas_dtype())
+                )
+            )
+
+    table = pa.Table.from_arrays(arrays, schema=pa.schema(list(CATALOG_SCHEMA)[:-1]))
+
+    # Stores the model features as fixed-size rows
+    features = build_feature_matrix(frame=catalog_table_to_frame(table=table))
+    table = table.append_column(
+        CATALOG_SCHEMA.field("features"),
+        pa.FixedSizeListArray.from_arrays(
+            pa.array(features.ravel()), len(FEATURE_COLUMNS)
+        ),
+    )
+
+    # Records the latest movie data update as the catalog version
+    if "updated_at" in movie_data.columns and movie_data["updated_at"].notna().any():
+        updated_at = pd.to_datetime(movie_data["updated_at"], utc=True).max()
+        table = table.replace_schema_metadata({"updated_at": updated_at.isoformat()})
+
+    return table
+
+
+def get_changed_rows(table: pa.Table, delta: pa.Table) -> np.ndarray:
+    """
+    Finds the delta rows of new movies or of movies that differ from the catalog.
+    """
+    positions = pc.index_in(delta["movie_id"], value_set=table["movie_id"])
+    is_changed = positions.is_null().to_numpy(zero_copy_only=False)
+
+    # Compares stored columns of movies already in the catalog
+    is_known = ~is_changed
+    if is_known.any():
+        current = table.take(positions.filter(pa.array(is_known)))
+        known = delta.filter(pa.array(is_known))
+        is_same = np.ones(known.num_rows, dtype="bool")
+        for name in CATALOG_SCHEMA.names[:-1]:
+            before, after = current[name], known[name]
+            same = pc.or_kleene(
+                pc.equal(before, after),
+                pc.and_kleene(pc.is_null(before), pc.is_null(after)),
+            )
+            if pa.types.is_floating(before.type):
+                same = pc.or_kleene(
+                    same, pc.and_kleene(pc.is_nan(before), pc.is_nan(after))
+                )
+            is_same &= pc.fill_null(same, False).to_numpy(zero_copy_only=False)
+        is_changed[is_known] = ~is_same
+
+    return np.flatnonzero(is_changed)
+
+
+def apply_catalog_delta(table: pa.Table, movie_data: pd.DataFrame) -> pa.Table:
+    """
+    Upserts changed movie data into the catalog table. Returns the same table if
+    no movie changed.
+    """
+    delta = build_catalog_table(movie_data=movie_data)
+    delta = delta.take(get_changed_rows(table=table, delta=delta))
+    if delta.num_rows == 0:
+        return table
+
+    # Replaces stale rows with their updated versions
+    is_stale = pc.is_in(table["movie_id"], value_set=delta["movie_id"])
+    merged = pa.concat_tables(
+        [
+            table.filter(pc.invert(is_stale)).replace_schema_metadata(None),
+            delta.replace_schema_metadata(None),
+        ]
+    ).combine_chunks()
+
+    # Keeps the latest version, since re-read updates may predate it
+    versions = [
+        pd.Timestamp(metadata[b"updated_at"].decode())
+        for metadata in [table.schema.metadata, delta.schema.metadata]
+        if metadata and b"updated_at" in metadata
+    ]
+    if not versions:
+        return merged
+
+    return merged.replace_schema_metadata({"updated_at": max(versions).isoformat()})
+
+
+def build_feature_matrix(frame: pd.DataFrame) -> np.ndarray:
+    """
+    Builds the contiguous model feature matrix of the catalog.
+    """
+    features = np.empty((len(frame), len(FEATURE_COLUMNS)), dtype="float32")
+    for i, column in enumerate(FEATURE_COLUMNS):
+        if column == "is_movie":
+            features[:, i] = (frame["content_type"] == "movie").to_numpy(
+                dtype="float32", na_value=False
+            )
+        else:
+            features[:, i] = frame[column].to_numpy(dtype="float32")
+
+    return features
+
+
+def decode_genres(genres: np.ndarray) -> np.ndarray:
+    """
+    Decodes packed genre integers into a matrix of genre flags ordered like
+    GENRES.
+    """
+    shifts = np.arange(len(GENRES) - 1, -1, -1, dtype="int32")
+
+    return ((genres[:, np.newaxis] >> shifts) & 1).astype("int8")
+
+
+def write_catalog_snapshot(table: pa.Table, path: str = CATALOG_SNAPSHOT_PATH) -> None:
+    """
+    Writes the catalog table to a local snapshot.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    # Writes to a temporary file so readers never see a partial snapshot
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(temp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(temp_path, path)
+
+
+def read_catalog_snapshot(path: str = CATALOG_SNAPSHOT_PATH) -> pa.Table:
+    """
+    Memory-maps the catalog table from a local snapshot.
+    """
+    source = pa.memory_map(path, "r")
+
+    return pa.ipc.open_file(source).read_all()
+
+
+def catalog_table_to_frame(table: pa.Table) -> pd.DataFrame:
+    """
+    Creates a read-only DataFrame view of the catalog table without copying.
+    """
+    columns = {}
+    for name in table.column_names:
+        column = table.column(name)
+        array = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+        if pa.types.is_fixed_size_list(array.type):
+            continue
+        elif pa.types.is_large_string(array.type):
+            columns[name] = pd.Series(pd.arrays.ArrowStringArray(array))
+        else:
+            columns[name] = array.to_numpy(zero_copy_only=True)
+
+    return pd.DataFrame(columns, copy=False)
+
+
+_catalog: MovieCatalog | None = None
+_catalog_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_general_scores_lock = threading.Lock()
+_watcher_pid: int | None = None
+
+
+def reset_catalog_locks() -> None:
+    """
+    Recreates the catalog locks in a forked worker, since a thread of the parent
+    process may have held them at fork time.
+    """
+    global _catalog_lock, _refresh_lock, _general_scores_lock
+
+    _catalog_lock = threading.Lock()
+    _refresh_lock = threading.Lock()
+    _general_scores_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=reset_catalog_locks)
+
+
+def load_movie_catalog(path: str = CATALOG_SNAPSHOT_PATH) -> MovieCatalog:
+    """
+    Loads the movie catalog from its snapshot, or from the database if there is
+    no snapshot.
+    """
+    start = time.perf_counter()
+
+    try:
+        # Rebuilds missing snapshots and snapshots with an outdated schema
+        if not os.path.exists(path) or not read_catalog_snapshot(
+            path=path
+        ).schema.equals(CATALOG_SCHEMA, check_metadata=False):
+            table = build_catalog_table(movie_data=database.load_movie_data_table())
+            write_catalog_snapshot(table=table, path=path)
+            print(f"Wrote movie catalog snapshot to {path}")
+
+        catalog = MovieCatalog(
+            table=read_catalog_snapshot(path=path),
+            snapshot_mtime=os.stat(path).st_mtime_ns,
+        )
+    except Exception as e:
+        print(e, file=sys.stderr)
+        raise e
+
+    finish = time.perf_counter()
+    print(f"Loaded {len(catalog)} movies into catalog in {finish - start} seconds")
+
+    return catalog
+
+
+def get_movie_catalog() -> MovieCatalog:
+    """
+    Gets the movie catalog.
+    """
+    global _catalog
+
+    catalog = _catalog
+    if catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = load_movie_catalog()
+            catalog = _catalog
+
+    # Starts the snapshot watcher in each worker process
+    if _watcher_pid != os.getpid() and not is_preloaded():
+        start_catalog_snapshot_watcher()
+
+    return catalog
+
+
+def precompute_general_scores(catalog: MovieCatalog) -> None:
+    """
+    Scores a catalog with the general model before it serves requests.
+    """
+    try:
+        catalog.get_general_scores()
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print("Failed to score movie catalog with general model", file=sys.stderr)
+
+
+def swap_movie_catalog(catalog: MovieCatalog) -> None:
+    """
+    Atomically replaces the movie catalog served to new requests.
+    """
+    global _catalog
+
+    with _catalog_lock:
+        _catalog = catalog
+
+
+def refresh_movie_catalog(
+    full: bool = False, path: str = CATALOG_SNAPSHOT_PATH
+) -> MovieCatalog:
+    """
+    Rebuilds the movie catalog from changed movie data and swaps it in.
+    """
+    start = time.perf_counter()
+
+    with _refresh_lock:
+        current = _catalog
+        if current is None and os.path.exists(path):
+            current = load_movie_catalog(path=path)
+
+        # Pulls only the movies updated since shortly before the catalog version
+        table = None
+        if not full and current is not None and current.updated_at is not None:
+            try:
+                updated_since = pd.Timestamp(current.updated_at) - pd.Timedelta(
+                    seconds=CATALOG_DELTA_MARGIN
+                )
+                delta = database.load_movie_data_table(
+                    updated_since=updated_since.isoformat()
+                )
+                table = apply_catalog_delta(table=current.table, movie_data=delta)
+                print(f"Checked {len(delta)} movie data updates against catalog")
+            except Exception as e:
+                print(e, file=sys.stderr)
+                print("Failed to apply movie data updates to catalog", file=sys.stderr)
+
+        # Falls back to a full rebuild
+        if table is None:
+            table = build_catalog_table(movie_data=database.load_movie_data_table())
+
+        # Keeps the current snapshot and version if no movie changed
+        if current is not None and table is current.table:
+            print("Movie catalog is up to date")
+            catalog = current
+        else:
+            write_catalog_snapshot(table=table, path=path)
+            catalog = MovieCatalog(
+                table=read_catalog_snapshot(path=path),
+                snapshot_mtime=os.stat(path).st_mtime_ns,
+            )
+        precompute_general_scores(catalog=catalog)
+        swap_movie_catalog(catalog=catalog)
+
+    finish = time.perf_counter()
+    print(f"Refreshed movie catalog in {finish - start} seconds")
+
+    return catalog
+
+
+def start_movie_catalog_refresh(full: bool = False) -> bool:
+    """
+    Refreshes the movie catalog in the background. Returns False if a refresh is
+    already in progress.
+    """
+    if _refresh_lock.locked():
+        return False
+
+    def refresh() -> None:
+        try:
+            refresh_movie_catalog(full=full)
+        except Exception as e:
+            print(e, file=sys.stderr)
+            print("Failed to refresh movie catalog", file=sys.stderr)
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+    return True
+
+
+def start_catalog_snapshot_watcher(
+    path: str = CATALOG_SNAPSHOT_PATH, interval: int = CATALOG_WATCH_INTERVAL
+) -> None:
+    """
+    Swaps in snapshots refreshed by other worker processes.
+    """
+    global _watcher_pid
+
+    with _catalog_lock:
+        if _watcher_pid == os.getpid():
+            return
+        _watcher_pid = os.getpid()
+
+    def watch() -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                catalog = _catalog
+                if catalog is None or _refresh_lock.locked():
+                    continue
+
+                # Remaps the snapshot if it was replaced
+                snapshot_mtime = os.stat(path).st_mtime_ns
+                if snapshot_mtime != catalog.snapshot_mtime:
+                    catalog = load_movie_catalog(path=path)
+                    precompute_general_scores(catalog=catalog)
+                    swap_movie_catalog(catalog=catalog)
+            except Exception as e:
+                print(e, file=sys.stderr)
+                print("Failed to check movie catalog snapshot", file=sys.stderr)
+
+    threading.Thread(target=watch, daemon=True).start()
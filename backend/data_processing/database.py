@@ -1,6 +1,5 @@
 from datetime import datetime, timezone
 from dotenv import load_dotenv
-from functools import lru_cache
 import io
 import os
 import pandas as pd
@@ -13,11 +12,42 @@ from typing import Any, Dict, Sequence, Tuple
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.append(project_root)
 
+from data_processing.binary_copy import (
+    BinaryCopyBuffer,
+    build_string_array,
+    decode_binary_copy_rows,
+    decode_binary_copy_value,
+    get_binary_copy_queries,
+)
+
 
 load_dotenv()
 
 SUPABASE_MAX_ROWS = 100000
 
+# Loaded column types of the movie data table
+MOVIE_DATA_COLUMNS = {
+    "movie_id": "int32",
+    "url": "string",
+    "title": "string",
+    "content_type": "string",
+    "release_year": "int16",
+    "runtime": "int16",
+    "letterboxd_rating": "float64",
+    "letterboxd_rating_count": "int32",
+    "genres": "int32",
+    "country_of_origin": "int16",
+    "poster": "string",
+    "updated_at": "timestamp",
+}
+
+# Loaded column types of the user ratings table
+USER_RATINGS_COLUMNS = {
+    "movie_id": "int32",
+    "user_rating": "float32",
+    "username": "string",
+}
+
 # Initializes Supabase
 try:
     supabase_url = os.environ["SUPABASE_URL"]
@@ -288,23 +318,97 @@ def update_movie_urls(urls_df: pd.DataFrame) -> None:
         raise e
 
 
-@lru_cache(maxsize=1)
-def get_movie_data_cached() -> Tuple:
+def get_postgres_connection() -> psycopg2.extensions.connection:
     """
-    Gets movie data from cache or database.
+    Connects directly to Postgres.
     """
-    from data_processing.utils import GENRES
+    return psycopg2.connect(
+        host=os.environ["SUPABASE_HOST"],
+        dbname=os.environ["SUPABASE_NAME"],
+        user=os.environ["SUPABASE_USER"],
+        password=os.environ["SUPABASE_PASSWORD"],
+        sslmode=os.getenv("SUPABASE_SSLMODE", "require"),
+    )
 
+
+def load_table_columns(
+    table: str,
+    columns: Dict[str, str],
+    order_by: str,
+    where: str | None = None,
+    params: Tuple = (),
+) -> pd.DataFrame:
+    """
+    Loads typed table columns from Postgres with binary COPY.
+    """
     try:
-        # Connects directly to Postgres
-        conn = psycopg2.connect(
-            host=os.environ["SUPABASE_HOST"],
-            dbname=os.environ["SUPABASE_NAME"],
-            user=os.environ["SUPABASE_USER"],
-            password=os.environ["SUPABASE_PASSWORD"],
-            sslmode="require",
+        conn = get_postgres_connection()
+
+        # Copies every column from the same table snapshot
+        conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+        buffers = []
+        with conn.cursor() as cursor:
+            if where is not None:
+                where = cursor.mogrify(where, params).decode()
+            for query in get_binary_copy_queries(
+                table=table, columns=columns, order_by=order_by, where=where
+            ):
+                buffer = BinaryCopyBuffer()
+                cursor.copy_expert(query, buffer)
+                buffers.append(buffer.data)
+        conn.close()
+    except Exception as e:
+        print(e, file=sys.stderr)
+        raise e
+
+    # Decodes numeric columns and string lengths
+    string_columns = [name for name, dtype in columns.items() if dtype == "string"]
+    dtypes = {name: dtype for name, dtype in columns.items() if dtype != "string"}
+    dtypes.update({f"{name}_octet_length": "int32" for name in string_columns})
+    decoded = decode_binary_copy_rows(data=buffers[0], dtypes=dtypes)
+
+    # Decodes string columns
+    data = {}
+    for name, dtype in columns.items():
+        if dtype == "string":
+            values = decode_binary_copy_value(
+                data=buffers[1 + string_columns.index(name)]
+            )
+            data[name] = pd.arrays.ArrowStringArray(
+                build_string_array(lengths=decoded[f"{name}_octet_length"], data=values)
+            )
+        else:
+            data[name] = decoded[name]
+
+    return pd.DataFrame(data, copy=False)
+
+
+def load_movie_data_table(updated_since: str | None = None) -> pd.DataFrame:
+    """
+    Loads the movie data table from Postgres, optionally only the movies updated
+    since a timestamp.
+    """
+    if updated_since is None:
+        return load_table_columns(
+            table="movie_data", columns=MOVIE_DATA_COLUMNS, order_by="movie_id"
         )
 
+    return load_table_columns(
+        table="movie_data",
+        columns=MOVIE_DATA_COLUMNS,
+        order_by="movie_id",
+        where="updated_at >= %s",
+        params=(updated_since,),
+    )
+
+
+def load_movie_data_table_csv() -> pd.DataFrame:
+    """
+    Loads the movie data table from Postgres with text COPY.
+    """
+    try:
+        conn = get_postgres_connection()
+
         # Loads movie data
         buffer = io.StringIO()
         with conn.cursor() as cursor:
@@ -313,26 +417,30 @@ def get_movie_data_cached() -> Tuple:
         movie_data = pd.read_csv(buffer)
         conn.close()
 
-        # Processes movie data
-        for i, genre in enumerate(reversed(GENRES)):
-            movie_data[f"is_{genre}"] = movie_data["genres"].apply(
-                lambda x: (x >> i) & 1
-            )
-        movie_data["url"] = movie_data["url"].astype("string")
-        movie_data["title"] = movie_data["title"].astype("string")
-        movie_data["poster"] = movie_data["poster"].astype("string")
-
-        return tuple(movie_data.to_dict("records"))
+        return movie_data
     except Exception as e:
         print(e, file=sys.stderr)
         raise e
 
 
+def load_user_ratings_table() -> pd.DataFrame:
+    """
+    Loads the user ratings table from Postgres.
+    """
+    return load_table_columns(
+        table="user_ratings",
+        columns=USER_RATINGS_COLUMNS,
+        order_by="username, movie_id",
+    )
+
+
 def get_movie_data() -> pd.DataFrame:
     """
-    Gets movie data.
+    Gets a read-only view of the movie catalog.
     """
-    return pd.DataFrame.from_records(get_movie_data_cached())
+    from data_processing.catalog import get_movie_catalog
+
+    return get_movie_catalog().frame
 
 
 def get_raw_movie_data() -> pd.DataFrame:
@@ -341,15 +341,15 @@ async def main(
     finish = time.perf_counter()
     print(f"Scraped movie data in {finish - start} seconds")
 
-    # Clears movie data cache
+    # Refreshes movie data cache
     if clear_movie_data_cache:
         try:
             url = f'{os.getenv("BACKEND_URL")}/api/admin/clear-movie-data-cache'
             headers = {"Authorization": f'Bearer {os.getenv("ADMIN_SECRET_KEY")}'}
             requests.post(url=url, headers=headers)
-            print("Successfully cleared movie data cache")
+            print("Successfully started movie data cache refresh")
         except Exception as e:
-            print("Failed to clear movie data cache", file=sys.stderr)
+            print("Failed to refresh movie data cache", file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -360,7 +360,7 @@ if __name__ == "__main__":
     parser.add_argument(
         "-c",
         "--clear-movie-data-cache",
-        help="Clears the movie data cache.",
+        help="Refreshes the movie data cache.",
         action="store_true",
     )
 
@@ -28,6 +28,9 @@ RATINGS = {
     "★★★★★": 5,
 }
 
+# Number of ratings needed to train a personalized model
+MIN_RATINGS = 5
+
 
 async def get_user_ratings(
     user: str,
@@ -35,6 +38,7 @@ async def get_user_ratings(
     exclude_liked: bool,
     verbose: bool,
     update_urls: bool,
+    min_ratings: int = MIN_RATINGS,
 ) -> Tuple[pd.DataFrame, Sequence[int]]:
     """
     Scrapes user ratings.
@@ -107,8 +111,9 @@ async def get_user_ratings(
     user_df["movie_id"] = user_df["movie_id"].astype("int")
     user_df["url"] = user_df["url"].astype("string")
 
-    # Verifies user has rated enough movies
-    if len(user_df) < 5:
+    # Verifies user has rated enough movies and has logged at least one movie, since
+    # private and nonexistent profiles have no movies
+    if len(user_df) < min_ratings or len(user_df) + len(unrated) == 0:
         print(f"{user} has not rated enough movies", file=sys.stderr)
         raise UserProfileException(f"{user} has not rated enough movies")
 
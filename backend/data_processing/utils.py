@@ -5,16 +5,19 @@ import json
 import os
 import pandas as pd
 import sys
-from typing import Dict, Sequence, Tuple
+from typing import Dict, Sequence, Tuple, TYPE_CHECKING
 from upstash_redis import Redis
 
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.append(project_root)
 
 from data_processing import database
-from data_processing.scrape_user_ratings import get_user_ratings
+from data_processing.scrape_user_ratings import get_user_ratings, MIN_RATINGS
 from infra.custom_exceptions import UserProfileException
 
+if TYPE_CHECKING:
+    from data_processing.catalog import MovieCatalog
+
 load_dotenv()
 
 # Connects to Upstash Redis
@@ -123,6 +126,31 @@ BINARY_COLS = [
 ]
 
 
+# Model feature columns, in the order the models are trained on
+FEATURE_COLUMNS = (
+    [
+        "release_year",
+        "runtime",
+        "country_of_origin",
+        "letterboxd_rating",
+        "letterboxd_rating_count",
+    ]
+    + [f"is_{genre}" for genre in GENRES]
+    + ["is_movie"]
+)
+
+
+def get_genre_mask(genres: Sequence[str]) -> int:
+    """
+    Gets the packed genre bitmask matching any of the genres.
+    """
+    mask = 0
+    for genre in genres:
+        mask |= 1 << (len(GENRES) - 1 - GENRES.index(genre))
+
+    return mask
+
+
 async def get_user_dataframe(
     user: str, movie_data: pd.DataFrame, update_urls: bool
 ) -> pd.DataFrame:
@@ -157,13 +185,16 @@ async def get_user_dataframe(
 
 
 async def get_processed_user_df(
-    user: str, update_urls: bool = True
-) -> Tuple[pd.DataFrame, Sequence[int], pd.DataFrame]:
+    user: str, update_urls: bool = True, min_ratings: int = MIN_RATINGS
+) -> Tuple[pd.DataFrame, Sequence[int], "MovieCatalog"]:
     """
-    Gets processed user df, unrated movies, and movie data.
+    Gets processed user df, unrated movies, and movie catalog.
     """
-    # Gets and processes movie data from the database
-    movie_data = database.get_movie_data()
+    from data_processing.catalog import get_movie_catalog
+
+    # Gets the movie catalog
+    catalog = get_movie_catalog()
+    movie_data = catalog.frame
 
     # Loads processed user df and unrated movies
     if current_app.config.get("TESTING"):
@@ -174,7 +205,17 @@ async def get_processed_user_df(
 
     if cached is not None:
         user_df, unrated = json.loads(cached)
-        user_df = pd.DataFrame(user_df)
+
+        # Keeps the columns of users without ratings
+        user_df = pd.DataFrame(
+            user_df, columns=["movie_id", "user_rating", "url", "username"]
+        )
+
+        # Verifies user has rated enough movies, since the cached ratings may
+        # have been scraped with a lower minimum
+        if len(user_df) < min_ratings:
+            print(f"{user} has not rated enough movies", file=sys.stderr)
+            raise UserProfileException(f"{user} has not rated enough movies")
     else:
         try:
             async with aiohttp.ClientSession() as session:
@@ -184,6 +225,7 @@ async def get_processed_user_df(
                     exclude_liked=True,
                     verbose=False,
                     update_urls=update_urls,
+                    min_ratings=min_ratings,
                 )
         except UserProfileException as e:
             print(e, file=sys.stderr)
@@ -202,9 +244,24 @@ async def get_processed_user_df(
             print(e, file=sys.stderr)
             print(f"Failed to add {user}'s rating data to cache", file=sys.stderr)
 
-    processed_user_df = user_df.merge(movie_data, on=["movie_id", "url"])
+    # Joins user ratings to catalog rows matching both movie_id and url
+    rows = catalog.get_rows_by_movie_id(movie_ids=user_df["movie_id"])
+    is_match = rows >= 0
+    is_match[is_match] = (
+        movie_data["url"].iloc[rows[is_match]].to_numpy(dtype=object)
+        == user_df["url"].to_numpy(dtype=object)[is_match]
+    )
+    processed_user_df = pd.concat(
+        [
+            user_df[is_match].reset_index(drop=True),
+            movie_data.iloc[rows[is_match]]
+            .drop(columns=["movie_id", "url"])
+            .reset_index(drop=True),
+        ],
+        axis=1,
+    )
 
-    return processed_user_df, unrated, movie_data
+    return processed_user_df, unrated, catalog
 
 
 def determine_era(year: float) -> str:
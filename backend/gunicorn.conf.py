@@ -0,0 +1,51 @@
+import gc
+import os
+import sys
+
+project_root = os.path.abspath(os.path.dirname(__file__))
+sys.path.append(project_root)
+
+wsgi_app = "main:app"
+
+# Loads the app once in the master process so that workers share the warm
+# movie catalog and general model pages instead of building their own copies
+preload_app = True
+
+# Tells the app that the master warms it up, so it does not start its own warm-up
+raw_env = [f"PRELOAD_APP={int(preload_app)}"]
+
+
+def when_ready(server) -> None:
+    """
+    Warms up the master process before any workers are forked.
+    """
+    if not server.cfg.preload_app:
+        return
+
+    from infra.warmup import warm_up
+
+    # Starts without a warm cache so routes that do not need it keep serving
+    try:
+        warm_up()
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print("Failed to warm up server", file=sys.stderr)
+
+    # Keeps the garbage collector from touching the shared objects in workers
+    gc.freeze()
+
+
+def post_fork(server, worker) -> None:
+    """
+    Starts the movie catalog and general model watchers in each worker, and
+    retries the warm-up if the master failed to warm up.
+    """
+    from data_processing.catalog import start_catalog_snapshot_watcher
+    from infra.warmup import is_ready, start_warm_up
+    from model.general_model import start_general_model_watcher
+
+    start_catalog_snapshot_watcher()
+    start_general_model_watcher()
+
+    if not is_ready():
+        start_warm_up()
@@ -0,0 +1,91 @@
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from joblib import parallel_config
+import os
+import sys
+import threading
+from typing import Any, Callable, Iterator
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(project_root)
+
+load_dotenv()
+
+# Number of threads shared by concurrent CPU-bound jobs
+CPU_THREADS = int(os.getenv("CPU_THREADS", os.cpu_count() or 1))
+
+_active_jobs = 0
+_allotted_threads = 0
+_budget_condition = threading.Condition()
+
+
+def reset_cpu_budget() -> None:
+    """
+    Resets the CPU budget in a forked process, which runs no jobs of its own.
+    """
+    global _active_jobs, _allotted_threads, _budget_condition
+
+    _active_jobs = 0
+    _allotted_threads = 0
+    _budget_condition = threading.Condition()
+
+
+os.register_at_fork(after_in_child=reset_cpu_budget)
+
+
+def reserve_threads(blocking: bool = True) -> int:
+    """
+    Reserves a fair share of the budget for a new job, splitting CPU_THREADS
+    evenly across running and waiting jobs. Every job needs at least one
+    thread, so jobs wait while every thread is allotted and concurrent jobs
+    never hold more than CPU_THREADS threads. Returns 0 without waiting if not
+    blocking and no thread is free.
+    """
+    global _active_jobs, _allotted_threads
+
+    with _budget_condition:
+        if not blocking and _allotted_threads >= CPU_THREADS:
+            return 0
+
+        # Counts the job while it waits so waiting jobs split freed threads
+        _active_jobs += 1
+        while _allotted_threads >= CPU_THREADS:
+            _budget_condition.wait()
+
+        fair_share = CPU_THREADS // _active_jobs
+        threads = max(1, min(fair_share, CPU_THREADS - _allotted_threads))
+        _allotted_threads += threads
+
+    return threads
+
+
+def release_threads(threads: int) -> None:
+    """
+    Returns a finished job's threads to the budget.
+    """
+    global _active_jobs, _allotted_threads
+
+    with _budget_condition:
+        _active_jobs -= 1
+        _allotted_threads -= threads
+        _budget_condition.notify_all()
+
+
+@contextmanager
+def job_threads(threads: int = CPU_THREADS) -> Iterator[None]:
+    """
+    Limits the scikit-learn estimators run in the current thread to a number of
+    threads.
+    """
+    with parallel_config(backend="threading", n_jobs=threads):
+        yield
+
+
+def run_with_threads(
+    threads: int, function: Callable[..., Any], *args: Any, **kwargs: Any
+) -> Any:
+    """
+    Runs a function with a thread allotment.
+    """
+    with job_threads(threads=threads):
+        return function(*args, **kwargs)
@@ -0,0 +1,167 @@
+import asyncio
+from dotenv import load_dotenv
+import multiprocessing
+from multiprocessing.connection import Connection
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(project_root)
+
+from infra.cpu_budget import release_threads, reserve_threads, run_with_threads
+
+load_dotenv()
+
+# Number of CPU-bound jobs run at once
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", os.cpu_count() or 1))
+
+# Seconds before a CPU-bound job is killed
+CPU_WORKER_TIMEOUT = float(os.getenv("CPU_WORKER_TIMEOUT", 120))
+
+_slots = threading.BoundedSemaphore(CPU_WORKERS)
+
+
+def reset_cpu_worker_slots() -> None:
+    """
+    Recreates the worker slots in a forked process.
+    """
+    global _slots
+
+    _slots = threading.BoundedSemaphore(CPU_WORKERS)
+
+
+os.register_at_fork(after_in_child=reset_cpu_worker_slots)
+
+
+def can_fork() -> bool:
+    """
+    Determines if jobs can run in forked worker processes.
+    """
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def run_job(
+    connection: Connection,
+    threads: int,
+    function: Callable[..., Any],
+    args: tuple,
+    kwargs: dict,
+) -> None:
+    """
+    Runs a job in a worker process and sends back its result or exception.
+    """
+    try:
+        result = (True, run_with_threads(threads, function, *args, **kwargs))
+    except Exception as e:
+        result = (False, e)
+
+    try:
+        connection.send(result)
+    except Exception as e:
+        connection.send((False, RuntimeError(f"Failed to send job result: {e}")))
+    finally:
+        connection.close()
+
+
+async def acquire_slot(deadline: float) -> None:
+    """
+    Waits for a free worker slot without blocking the event loop.
+    """
+    delay = 0.005
+    while not _slots.acquire(blocking=False):
+        if time.monotonic() >= deadline:
+            raise asyncio.TimeoutError("Timed out waiting for a CPU worker")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.1)
+
+
+async def acquire_threads(deadline: float) -> int:
+    """
+    Waits for a share of the CPU budget without blocking the event loop.
+    """
+    delay = 0.005
+    while True:
+        threads = reserve_threads(blocking=False)
+        if threads > 0:
+            return threads
+        if time.monotonic() >= deadline:
+            raise asyncio.TimeoutError("Timed out waiting for CPU threads")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.1)
+
+
+async def run_in_worker(
+    function: Callable[..., Any],
+    *args: Any,
+    timeout: float | None = CPU_WORKER_TIMEOUT,
+    **kwargs: Any,
+) -> Any:
+    """
+    Runs a CPU-bound function in a forked worker process with a share of the CPU
+    budget, killing the worker if the timeout expires or the awaiting task is
+    cancelled. The worker inherits the function and its arguments, so only the
+    result is serialized. Falls back to a thread where fork is unavailable.
+    """
+    deadline = time.monotonic() + (timeout if timeout is not None else float("inf"))
+    if not can_fork():
+        threads = await acquire_threads(deadline=deadline)
+        try:
+            return await asyncio.wait_for(
+                asyncio.to_thread(run_with_threads, threads, function, *args, **kwargs),
+                timeout=timeout,
+            )
+        finally:
+            release_threads(threads=threads)
+
+    await acquire_slot(deadline=deadline)
+    try:
+        threads = await acquire_threads(deadline=deadline)
+    except BaseException as e:
+        _slots.release()
+        raise e
+
+    context = multiprocessing.get_context("fork")
+    process = None
+    reader = None
+    try:
+        reader, writer = context.Pipe(duplex=False)
+        worker = context.Process(
+            target=run_job,
+            args=(writer, threads, function, args, kwargs),
+            daemon=True,
+        )
+        try:
+            worker.start()
+        finally:
+            writer.close()
+        process = worker
+
+        try:
+            success, result = await asyncio.wait_for(
+                asyncio.to_thread(reader.recv),
+                timeout=(
+                    None if timeout is None else max(deadline - time.monotonic(), 0)
+                ),
+            )
+        except EOFError:
+            raise RuntimeError(
+                f"CPU worker exited with code {process.exitcode} before finishing"
+            )
+    finally:
+        # Kills the worker if it is still running
+        if process is not None:
+            if process.is_alive():
+                process.kill()
+            process.join(timeout=1)
+        if reader is not None:
+            reader.close()
+        release_threads(threads=threads)
+        _slots.release()
+
+    if not success:
+        raise result
+
+    return result
@@ -0,0 +1,60 @@
+import os
+import sys
+import threading
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(project_root)
+
+_ready = threading.Event()
+_warm_up_lock = threading.Lock()
+
+
+def warm_up() -> None:
+    """
+    Loads the movie catalog and general model into the current process, and
+    scores the catalog with the general model.
+    """
+    from data_processing.catalog import get_movie_catalog
+
+    with _warm_up_lock:
+        if _ready.is_set():
+            return
+
+        start = time.perf_counter()
+
+        get_movie_catalog().get_general_scores()
+        _ready.set()
+
+        finish = time.perf_counter()
+        print(f"Warmed up server in {finish - start} seconds")
+
+
+def start_warm_up() -> None:
+    """
+    Warms up the server in the background.
+    """
+
+    def run() -> None:
+        try:
+            warm_up()
+        except Exception as e:
+            print(e, file=sys.stderr)
+            print("Failed to warm up server", file=sys.stderr)
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def is_preloaded() -> bool:
+    """
+    Determines if the gunicorn master preloads the app, in which case gunicorn
+    warms it up and starts the file watchers in its workers.
+    """
+    return os.getenv("PRELOAD_APP") == "1"
+
+
+def is_ready() -> bool:
+    """
+    Determines if the server has finished warming up.
+    """
+    return _ready.is_set()
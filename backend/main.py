@@ -11,6 +11,7 @@ from werkzeug.exceptions import (
     GatewayTimeout,
     InternalServerError,
     NotAcceptable,
+    ServiceUnavailable,
     TooManyRequests,
     Unauthorized,
 )
@@ -20,6 +21,7 @@ project_root = os.path.abspath(os.path.dirname(__file__))
 sys.path.append(project_root)
 
 from data_processing import database
+from data_processing.catalog import start_movie_catalog_refresh
 from data_processing.calculate_user_statistics import (
     get_user_percentiles,
     get_user_statistics,
@@ -39,6 +41,8 @@ from infra.custom_exceptions import (
     WatchlistOverlapException,
 )
 from infra.custom_decorators import rate_limit
+from infra.warmup import is_preloaded, is_ready, start_warm_up
+from model.general_model import start_general_model_reload
 from model.inference.filter_inference import generate_recommendation_filters
 from model.recommender import merge_recommendations, predict_movies, recommend_n_movies
 
@@ -49,6 +53,11 @@ app = Flask(__name__)
 cors = CORS(app, origins="*")
 app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_port=1)
 
+# Loads the movie catalog and general model before the first request, unless the
+# gunicorn master already warms up the preloaded app
+if not is_preloaded():
+    start_warm_up()
+
 
 @app.errorhandler(400)
 def bad_request_handler(error: BadRequest) -> tuple[Response, int]:
@@ -115,6 +124,19 @@ def internal_server_error_handler(error: InternalServerError) -> tuple[Response,
     return jsonify(response_body), 500
 
 
+@app.errorhandler(503)
+def service_unavailable_handler(error: ServiceUnavailable) -> tuple[Response, int]:
+    """
+    Error handler for HTTP status 503.
+    """
+    response_body = {
+        "success": False,
+        "message": error.description or "Service unavailable",
+    }
+
+    return jsonify(response_body), 503
+
+
 @app.errorhandler(504)
 def gateway_timeout_handler(error: GatewayTimeout) -> tuple[Response, int]:
     """
@@ -142,6 +164,22 @@ def base_url() -> tuple[Response, int]:
     return jsonify(response_body), 200
 
 
+@app.route("/api/ready", methods=["GET"])
+def ready() -> tuple[Response, int]:
+    """
+    Reports whether the server has finished warming up.
+    """
+    if not is_ready():
+        abort(code=503, description="Server is warming up")
+
+    response_body = {
+        "success": True,
+        "message": "Server is ready",
+    }
+
+    return jsonify(response_body), 200
+
+
 @app.route("/api/users", methods=["GET"])
 def users() -> tuple[Response, int]:
     """
@@ -756,23 +794,55 @@ async def get_release_notes() -> tuple[Response, int]:
 
 
 @app.route("/api/admin/clear-movie-data-cache", methods=["POST"])
-def clear_movie_data_cache() -> tuple[Response, int]:
+def refresh_movie_data_cache() -> tuple[Response, int]:
+    """
+    Refreshes movie data cache in the background.
+    """
+    auth = request.headers.get("Authorization")
+    if auth != f'Bearer {os.getenv("ADMIN_SECRET_KEY")}':
+        abort(code=401, description="Unauthorized")
+
+    try:
+        full = request.args.get("full", "false").lower() == "true"
+        started = start_movie_catalog_refresh(full=full)
+    except Exception as e:
+        print(e, file=sys.stderr)
+        abort(code=500, description="Failed to refresh movie data cache")
+
+    response_body = {
+        "success": True,
+        "message": (
+            "Successfully started movie data cache refresh"
+            if started
+            else "Movie data cache refresh already in progress"
+        ),
+    }
+
+    return jsonify(response_body), 200
+
+
+@app.route("/api/admin/reload-general-model", methods=["POST"])
+def reload_general_model() -> tuple[Response, int]:
     """
-    Clears movie data cache.
+    Swaps in a newly deployed general model in the background.
     """
     auth = request.headers.get("Authorization")
     if auth != f'Bearer {os.getenv("ADMIN_SECRET_KEY")}':
         abort(code=401, description="Unauthorized")
 
     try:
-        database.get_movie_data_cached.cache_clear()
+        started = start_general_model_reload()
     except Exception as e:
         print(e, file=sys.stderr)
-        abort(code=500, description="Failed to clear movie data cache")
+        abort(code=500, description="Failed to reload general model")
 
     response_body = {
         "success": True,
-        "message": "Successfully cleared movie data cache",
+        "message": (
+            "Successfully started general model reload"
+            if started
+            else "General model reload already in progress"
+        ),
     }
 
     return jsonify(response_body), 200
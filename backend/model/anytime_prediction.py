@@ -0,0 +1,98 @@
+from dotenv import load_dotenv
+from joblib import delayed, Parallel
+import numpy as np
+import os
+import pandas as pd
+from sklearn.base import BaseEstimator
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(project_root)
+
+load_dotenv()
+
+# Seconds spent scoring a pool before returning the partial ensemble
+PREDICTION_BUDGET = float(os.getenv("ANYTIME_PREDICTION_BUDGET", 5))
+
+# Number of trees evaluated between stopping checks
+TREE_BATCH_SIZE = 10
+
+# Number of consecutive batches the top-k ranking must be unchanged to stop
+STABLE_BATCHES = 3
+
+
+def get_top_k_ranking(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Gets the positions of the k highest scores, ordered as they would be shown
+    with scores rounded to 2 decimals.
+    """
+    rounded = np.round(scores, 2)
+    if k < len(scores):
+        candidates = np.argpartition(-rounded, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+
+    return candidates[np.lexsort((candidates, -rounded[candidates]))]
+
+
+def predict_anytime(
+    model: BaseEstimator,
+    X: pd.DataFrame,
+    k: int,
+    budget: float = PREDICTION_BUDGET,
+    offset: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Predicts ratings with a forest tree by tree, stopping early once the time
+    budget is spent or the top-k ranking has stopped changing. Since the trees
+    of a random forest are independent, every prefix of the forest is a smaller
+    forest, so the partial average is a usable prediction. Adds an optional
+    offset to every prediction. Other models predict normally.
+    """
+    if offset is None:
+        offset = np.zeros(len(X), dtype="float64")
+
+    trees = getattr(model, "estimators_", None)
+    if trees is None:
+        return offset + model.predict(X)
+
+    start = time.perf_counter()
+
+    k = min(k, len(X))
+    X = np.ascontiguousarray(X, dtype="float32")
+
+    totals = np.zeros(len(X), dtype="float64")
+    ranking = None
+    stable_batches = 0
+    num_trees = 0
+    while num_trees < len(trees):
+        batch = trees[num_trees : num_trees + TREE_BATCH_SIZE]
+        predictions = Parallel(prefer="threads")(
+            delayed(tree.predict)(X, check_input=False) for tree in batch
+        )
+        for prediction in predictions:
+            totals += prediction
+        num_trees += len(batch)
+
+        # Stops once the budget is spent
+        if time.perf_counter() - start >= budget:
+            break
+
+        # Stops once the top-k ranking is stable
+        current_ranking = get_top_k_ranking(scores=offset + totals / num_trees, k=k)
+        if ranking is not None and np.array_equal(current_ranking, ranking):
+            stable_batches += 1
+            if stable_batches >= STABLE_BATCHES:
+                break
+        else:
+            stable_batches = 0
+        ranking = current_ranking
+
+    finish = time.perf_counter()
+    print(
+        f"Scored {len(X)} movies with {num_trees} of {len(trees)} trees "
+        f"in {finish - start} seconds"
+    )
+
+    return offset + totals / num_trees
@@ -0,0 +1,143 @@
+import numpy as np
+import os
+import pandas as pd
+from sklearn.base import BaseEstimator
+import sys
+from typing import Sequence
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(project_root)
+
+# Number of rows traversed at once, sized so a chunk's buffers stay in cache
+CHUNK_SIZE = 1024
+
+
+class FlatForest:
+    """
+    Regression forest exported to contiguous node arrays and evaluated with
+    vectorized traversal in float32. Predictions match scikit-learn exactly.
+    Used as the storage format of compressed general models, not to serve
+    personalized predictions.
+    """
+
+    def __init__(self, trees: Sequence[BaseEstimator]) -> None:
+        features, thresholds, children, values, missing_go_to_left = (
+            [],
+            [],
+            [],
+            [],
+            [],
+        )
+        roots = []
+        offset = 0
+        for tree in trees:
+            tree_ = tree.tree_
+            num_nodes = tree_.node_count
+            is_leaf = tree_.children_left == -1
+            node_ids = np.arange(offset, offset + num_nodes, dtype="int32")
+
+            # Leaves point to themselves so every row can take the same steps
+            left = np.where(is_leaf, node_ids, tree_.children_left + offset)
+            right = np.where(is_leaf, node_ids, tree_.children_right + offset)
+
+            features.append(np.where(is_leaf, 0, tree_.feature))
+            thresholds.append(get_float32_thresholds(thresholds=tree_.threshold))
+            children.append(np.stack([left, right], axis=1))
+            values.append(tree_.value[:, 0, 0])
+            missing_go_to_left.append(tree_.missing_go_to_left.astype("bool"))
+            roots.append(offset)
+            offset += num_nodes
+
+        self.features = np.concatenate(features).astype("int32")
+        self.thresholds = np.concatenate(thresholds)
+        self.children = np.concatenate(children).astype("int32").ravel()
+        self.values = np.concatenate(values).astype("float64")
+        self.missing_go_to_left = np.concatenate(missing_go_to_left)
+        self.roots = np.array(roots, dtype="int32")
+        self.max_depth = max(tree.tree_.max_depth for tree in trees)
+
+    def __len__(self) -> int:
+        return len(self.roots)
+
+    def apply(
+        self, X: np.ndarray, start: int = 0, stop: int | None = None
+    ) -> np.ndarray:
+        """
+        Gets the leaf of each row in trees start to stop, as a rows by trees
+        array.
+        """
+        roots = self.roots[start:stop]
+        shape = (len(X), len(roots))
+        has_missing = np.isnan(X).any()
+        X_flat = X.ravel()
+
+        nodes = np.broadcast_to(roots, shape).copy()
+        row_offsets = np.arange(len(X), dtype="int32")[:, np.newaxis] * X.shape[1]
+
+        # Reuses buffers across levels to avoid allocating in the loop
+        positions = np.empty(shape, dtype="int32")
+        values = np.empty(shape, dtype="float32")
+        thresholds = np.empty(shape, dtype="float32")
+        go_right = np.empty(shape, dtype="bool")
+        for _ in range(self.max_depth):
+            np.take(self.features, nodes, out=positions)
+            positions += row_offsets
+            np.take(X_flat, positions, out=values)
+            np.take(self.thresholds, nodes, out=thresholds)
+            np.greater(values, thresholds, out=go_right)
+            if has_missing:
+                go_right |= np.isnan(values) & ~self.missing_go_to_left[nodes]
+
+            # Children of node i are stored at 2i (left) and 2i + 1 (right)
+            nodes *= 2
+            nodes += go_right
+            np.take(self.children, nodes, out=nodes)
+
+        return nodes
+
+    def accumulate(
+        self,
+        X: np.ndarray,
+        totals: np.ndarray,
+        start: int = 0,
+        stop: int | None = None,
+    ) -> None:
+        """
+        Adds the predictions of trees start to stop to running totals, one tree
+        at a time in forest order so sums match scikit-learn's.
+        """
+        for chunk_start in range(0, len(X), CHUNK_SIZE):
+            chunk = slice(chunk_start, chunk_start + CHUNK_SIZE)
+            leaf_values = self.values[self.apply(X=X[chunk], start=start, stop=stop)]
+            for i in range(leaf_values.shape[1]):
+                totals[chunk] += leaf_values[:, i]
+
+    def predict(self, X: pd.DataFrame | np.ndarray) -> np.ndarray:
+        """
+        Predicts the average of every tree.
+        """
+        X = np.ascontiguousarray(X, dtype="float32")
+        totals = np.zeros(len(X), dtype="float64")
+        self.accumulate(X=X, totals=totals)
+
+        return totals / len(self)
+
+    def quantize_values(self, dtype: str = "float16") -> None:
+        """
+        Stores leaf values at a lower precision, trading exact predictions for a
+        smaller model.
+        """
+        self.values = self.values.astype(dtype)
+
+
+def get_float32_thresholds(thresholds: np.ndarray) -> np.ndarray:
+    """
+    Gets the largest float32 value at most each threshold. scikit-learn compares
+    float32 features to float64 thresholds, and for any float32 x, x <= t holds
+    exactly when x is at most the largest float32 not above t.
+    """
+    rounded = thresholds.astype("float32")
+    is_above = rounded.astype("float64") > thresholds
+    rounded[is_above] = np.nextafter(rounded[is_above], np.float32(-np.inf))
+
+    return rounded
@@ -0,0 +1,316 @@
+import argparse
+import numpy as np
+import os
+import pandas as pd
+from sklearn.base import BaseEstimator
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import root_mean_squared_error
+import sys
+import tempfile
+import time
+from typing import Dict, Literal, Tuple
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(project_root)
+
+from infra.cpu_budget import job_threads
+from model.flat_forest import FlatForest
+from model.general.train_general_model import split_general_training_data
+from model.general_model import load_general_model, save_general_model
+
+CompressionStage = Literal["original", "distilled", "pruned", "quantized"]
+
+# Largest validation RMSE increase over the original model of an automatically
+# selected stage
+RMSE_TOLERANCE = 0.01
+
+
+def distill_general_model(
+    model: BaseEstimator,
+    X_train: pd.DataFrame,
+    n_estimators: int,
+    max_depth: int | None,
+    min_samples_leaf: int,
+    ccp_alpha: float,
+) -> RandomForestRegressor:
+    """
+    Distills the general model into a smaller forest fitted to its predictions,
+    pruning each tree by minimal cost-complexity pruning.
+    """
+    student = RandomForestRegressor(
+        random_state=0,
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        min_samples_leaf=min_samples_leaf,
+        ccp_alpha=ccp_alpha,
+    )
+
+    # Fits the student to the original model's predictions with the full CPU budget
+    with job_threads():
+        student.fit(X_train, model.predict(X_train))
+
+    return student
+
+
+def quantize_general_model(model: RandomForestRegressor) -> FlatForest:
+    """
+    Exports a forest to flat arrays with float32 thresholds and float16 leaf
+    values.
+    """
+    flat_forest = FlatForest(trees=model.estimators_)
+    flat_forest.quantize_values(dtype="float16")
+
+    return flat_forest
+
+
+def evaluate_general_model(
+    model: BaseEstimator,
+    original_predictions: np.ndarray,
+    X_val: pd.DataFrame,
+    y_val: pd.Series,
+    repeats: int,
+) -> Dict[str, float]:
+    """
+    Measures a general model's size, load time, inference latency, and
+    validation RMSE.
+    """
+    with tempfile.TemporaryDirectory() as path:
+        file = os.path.join(path, "general_model.pkl")
+        save_general_model(model=model, save_path=file)
+        size = os.stat(file).st_size
+
+        load_times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            load_general_model(load_path=file)
+            load_times.append(time.perf_counter() - start)
+
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predictions = model.predict(X_val)
+        latencies.append(time.perf_counter() - start)
+
+    return {
+        "size_mb": size / 1e6,
+        "load_seconds": min(load_times),
+        "latency_seconds": min(latencies),
+        "rmse_val": root_mean_squared_error(y_val, predictions),
+        "rmse_original": root_mean_squared_error(original_predictions, predictions),
+    }
+
+
+def select_general_model_stage(
+    report: pd.DataFrame, rmse_tolerance: float = RMSE_TOLERANCE
+) -> CompressionStage:
+    """
+    Selects the fastest stage whose validation RMSE is within a tolerance of the
+    original model's.
+    """
+    max_rmse = report.loc["original", "rmse_val"] + rmse_tolerance
+    candidates = report[report["rmse_val"] <= max_rmse]
+
+    return candidates["latency_seconds"].idxmin()
+
+
+def compress_general_model(
+    load_path: str,
+    n_estimators: int,
+    max_depth: int | None,
+    min_samples_leaf: int,
+    ccp_alpha: float,
+    repeats: int = 3,
+    save_stage: CompressionStage | Literal["auto"] = "auto",
+    rmse_tolerance: float = RMSE_TOLERANCE,
+    save_path: str | None = None,
+    verbose: bool = False,
+) -> Tuple[BaseEstimator | FlatForest, pd.DataFrame]:
+    """
+    Distills, prunes, and quantizes the general model, reporting each stage
+    against the original model on the validation split. Returns the save stage,
+    or by default the fastest stage within an RMSE tolerance of the original.
+    """
+    model = load_general_model(load_path=load_path)
+    X_train, _, X_val, _, _, y_val = split_general_training_data(verbose=verbose)
+    original_predictions = model.predict(X_val)
+
+    # Distills the original model into a smaller forest, unpruned and pruned
+    distilled = distill_general_model(
+        model=model,
+        X_train=X_train,
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        min_samples_leaf=min_samples_leaf,
+        ccp_alpha=0,
+    )
+    if verbose:
+        print("Distilled general model")
+    pruned = distill_general_model(
+        model=model,
+        X_train=X_train,
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        min_samples_leaf=min_samples_leaf,
+        ccp_alpha=ccp_alpha,
+    )
+    if verbose:
+        print("Pruned general model")
+
+    # Quantizes the pruned forest
+    quantized = quantize_general_model(model=pruned)
+    if verbose:
+        print("Quantized general model")
+
+    # Reports every stage
+    stages = {
+        "original": model,
+        "distilled": distilled,
+        "pruned": pruned,
+        "quantized": quantized,
+    }
+    report = pd.DataFrame(
+        [
+            {
+                "stage": stage,
+                **evaluate_general_model(
+                    model=stage_model,
+                    original_predictions=original_predictions,
+                    X_val=X_val,
+                    y_val=y_val,
+                    repeats=repeats,
+                ),
+            }
+            for stage, stage_model in stages.items()
+        ]
+    ).set_index("stage")
+
+    # Selects the stage to save and records the choice in the report
+    if save_stage == "auto":
+        save_stage = select_general_model_stage(
+            report=report, rmse_tolerance=rmse_tolerance
+        )
+    report["selected"] = report.index == save_stage
+    if verbose:
+        print(f"Selected {save_stage} general model")
+
+    # Saves compressed model to disk
+    if save_path is not None:
+        try:
+            save_general_model(model=stages[save_stage], save_path=save_path)
+            if verbose:
+                print(f"Saved {save_stage} general model to {save_path}")
+
+        except:
+            raise ValueError("Compressed general model save path is invalid")
+
+    return stages[save_stage], report
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+
+    # Original model path
+    parser.add_argument(
+        "-lp",
+        "--load_path",
+        default="../models/general_rf_model.pkl",
+        help="Original general model path.",
+    )
+
+    # N estimators
+    parser.add_argument(
+        "-n",
+        "--n-estimators",
+        type=int,
+        default=30,
+        help="Number of decision trees in the compressed model.",
+    )
+
+    # Max depth
+    parser.add_argument(
+        "-md",
+        "--max-depth",
+        type=int,
+        default=12,
+        help="Maximum depth of a compressed decision tree.",
+    )
+
+    # Minimum samples leaf
+    parser.add_argument(
+        "-msl",
+        "--min-samples-leaf",
+        type=int,
+        default=5,
+        help="Minimum number of samples in a leaf node.",
+    )
+
+    # Cost-complexity pruning
+    parser.add_argument(
+        "-a",
+        "--ccp-alpha",
+        type=float,
+        default=1e-5,
+        help="Complexity parameter of minimal cost-complexity pruning.",
+    )
+
+    # Repeats
+    parser.add_argument(
+        "-r",
+        "--repeats",
+        type=int,
+        default=3,
+        help="Number of timed loads and predictions per stage.",
+    )
+
+    # Save stage
+    parser.add_argument(
+        "-ss",
+        "--save-stage",
+        choices=["auto", "original", "distilled", "pruned", "quantized"],
+        default="auto",
+        help="Stage to save, or the fastest stage within the RMSE tolerance.",
+    )
+
+    # RMSE tolerance
+    parser.add_argument(
+        "-t",
+        "--rmse-tolerance",
+        type=float,
+        default=RMSE_TOLERANCE,
+        help="Largest validation RMSE increase of an automatically selected stage.",
+    )
+
+    # Model save path
+    parser.add_argument(
+        "-sp",
+        "--save_path",
+        help="Compressed model save path.",
+    )
+
+    # Verbose
+    parser.add_argument(
+        "-v", "--verbose", help="The verbosity of the pipeline.", action="store_true"
+    )
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    # Compresses general recommendation model
+    _, report = compress_general_model(
+        load_path=args.load_path,
+        n_estimators=args.n_estimators,
+        max_depth=args.max_depth,
+        min_samples_leaf=args.min_samples_leaf,
+        ccp_alpha=args.ccp_alpha,
+        repeats=args.repeats,
+        save_stage=args.save_stage,
+        rmse_tolerance=args.rmse_tolerance,
+        save_path=args.save_path,
+        verbose=args.verbose,
+    )
+
+    finish = time.perf_counter()
+    print(report.to_string())
+    print(f"Compressed general model in {finish - start} seconds")
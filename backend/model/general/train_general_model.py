@@ -2,7 +2,6 @@ import argparse
 import numpy as np
 import os
 import pandas as pd
-import pickle
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import root_mean_squared_error
 from sklearn.model_selection import train_test_split
@@ -13,16 +12,16 @@ from typing import Tuple
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
 sys.path.append(project_root)
 
+from infra.cpu_budget import job_threads
+from model.general_model import save_general_model
 
-def train_general_model(
-    n_estimators: int,
-    max_depth: int,
-    min_samples_split: int,
-    save_path: str | None = None,
+
+def split_general_training_data(
     verbose: bool = False,
-) -> Tuple[RandomForestRegressor, float, float, float, float]:
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.Series, pd.Series, pd.Series]:
     """
-    Trains general model.
+    Loads general training data and splits it into train, test, and validation
+    sets.
     """
 
     # Loads training data
@@ -46,6 +45,25 @@ def train_general_model(
         X_test, y_test, test_size=0.5, random_state=0
     )
 
+    return X_train, X_test, X_val, y_train, y_test, y_val
+
+
+def train_general_model(
+    n_estimators: int,
+    max_depth: int,
+    min_samples_split: int,
+    save_path: str | None = None,
+    verbose: bool = False,
+) -> Tuple[RandomForestRegressor, float, float, float, float]:
+    """
+    Trains general model.
+    """
+
+    # Loads and splits training data
+    X_train, X_test, X_val, y_train, y_test, y_val = split_general_training_data(
+        verbose=verbose
+    )
+
     # Initializes model
     model = RandomForestRegressor(
         random_state=0,
@@ -54,16 +72,16 @@ def train_general_model(
         min_samples_split=min_samples_split,
     )
 
-    # Fits recommendation model on user training data
-    model.fit(X_train, y_train)
+    # Fits recommendation model on user training data with the full CPU budget
+    with job_threads():
+        model.fit(X_train, y_train)
     if verbose:
         print("Trained general model")
 
     # Saves model to disk
     if save_path is not None:
         try:
-            with open(save_path, "wb") as f:
-                pickle.dump(model, f)
+            save_general_model(model=model, save_path=save_path)
             if verbose:
                 print(f"Saved general model to {save_path}")
 
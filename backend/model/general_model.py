@@ -1,13 +1,32 @@
+from dotenv import load_dotenv
+import hashlib
+import joblib
 import os
 import pandas as pd
-import pickle
 from sklearn.ensemble import RandomForestRegressor
 import sys
+import threading
+import time
+from typing import Tuple
 
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.append(project_root)
 
 from data_processing.utils import GENRES
+from infra.warmup import is_preloaded
+from model.flat_forest import FlatForest
+
+load_dotenv()
+
+GENERAL_MODEL_PATH = os.getenv(
+    "GENERAL_MODEL_PATH", "./model/models/general_rf_model.pkl"
+)
+
+# Served general model, a forest or a compressed flat forest
+GeneralModel = RandomForestRegressor | FlatForest
+
+# Seconds between checks for a general model reloaded by another worker
+GENERAL_MODEL_WATCH_INTERVAL = int(os.getenv("GENERAL_MODEL_WATCH_INTERVAL", 30))
 
 
 def prepare_general_features(X: pd.DataFrame) -> pd.DataFrame:
@@ -65,17 +84,191 @@ def prepare_general_features(X: pd.DataFrame) -> pd.DataFrame:
     return X
 
 
-def load_general_model(
-    load_path: str = "./model/models/general_rf_model.pkl",
-) -> RandomForestRegressor:
+def load_general_model(load_path: str = GENERAL_MODEL_PATH) -> GeneralModel:
     """
-    Loads general model.
+    Loads general model, memory-mapping its arrays if it was saved with joblib.
     """
     try:
-        with open(load_path, "rb") as f:
-            model = pickle.load(f)
-
-        return model
+        return joblib.load(load_path, mmap_mode="r")
     except Exception as e:
         print(e, file=sys.stderr)
         raise ValueError("General model path is invalid")
+
+
+def save_general_model(
+    model: GeneralModel, save_path: str = GENERAL_MODEL_PATH
+) -> None:
+    """
+    Saves general model uncompressed so its arrays can be memory-mapped.
+    """
+    # Writes to a temporary file so workers never load a partial model
+    temp_path = f"{save_path}.{os.getpid()}.tmp"
+    joblib.dump(model, temp_path)
+    os.replace(temp_path, save_path)
+
+
+def get_general_model_version(load_path: str = GENERAL_MODEL_PATH) -> str:
+    """
+    Gets a content hash of the general model file.
+    """
+    digest = hashlib.sha256()
+    with open(load_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+
+    return digest.hexdigest()[:16]
+
+
+# Version, model, and file modification time of the served general model
+_general_model: Tuple[str, GeneralModel, int] | None = None
+_general_model_lock = threading.Lock()
+_reload_lock = threading.Lock()
+_watcher_pid: int | None = None
+
+
+def reset_general_model_locks() -> None:
+    """
+    Recreates the general model locks in a forked worker.
+    """
+    global _general_model_lock, _reload_lock
+
+    _general_model_lock = threading.Lock()
+    _reload_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=reset_general_model_locks)
+
+
+def read_general_model(
+    load_path: str = GENERAL_MODEL_PATH,
+) -> Tuple[str, GeneralModel, int]:
+    """
+    Reads the version, model, and file modification time of the general model.
+    """
+    # Reads the modification time first so a model replaced while loading is
+    # seen as changed by the watcher
+    mtime = os.stat(load_path).st_mtime_ns
+
+    return (
+        get_general_model_version(load_path=load_path),
+        load_general_model(load_path=load_path),
+        mtime,
+    )
+
+
+def get_versioned_general_model() -> Tuple[str, GeneralModel]:
+    """
+    Gets the version and general model, loading it once per process.
+    """
+    global _general_model
+
+    entry = _general_model
+    if entry is None:
+        with _general_model_lock:
+            if _general_model is None:
+                _general_model = read_general_model()
+            entry = _general_model
+
+    # Starts the model file watcher in each worker process, unless gunicorn
+    # starts it after forking workers from the preloaded master
+    if _watcher_pid != os.getpid() and not is_preloaded():
+        start_general_model_watcher()
+
+    return entry[0], entry[1]
+
+
+def get_general_model() -> GeneralModel:
+    """
+    Gets the general model, loading it once per process.
+    """
+    return get_versioned_general_model()[1]
+
+
+def reload_general_model(load_path: str = GENERAL_MODEL_PATH) -> bool:
+    """
+    Loads a newly deployed general model, scores the movie catalog with it, and
+    atomically swaps it in. Returns False if the deployed model is unchanged.
+    """
+    from data_processing.catalog import get_movie_catalog
+
+    global _general_model
+
+    start = time.perf_counter()
+
+    with _reload_lock:
+        mtime = os.stat(load_path).st_mtime_ns
+        version = get_general_model_version(load_path=load_path)
+
+        current = _general_model
+        if current is not None and current[0] == version:
+            with _general_model_lock:
+                _general_model = (version, current[1], mtime)
+            return False
+
+        model = load_general_model(load_path=load_path)
+
+        # Scores the catalog before the swap so no request scores it
+        try:
+            get_movie_catalog().score_general_model(version=version, model=model)
+        except Exception as e:
+            print(e, file=sys.stderr)
+            print("Failed to score movie catalog with general model", file=sys.stderr)
+
+        with _general_model_lock:
+            _general_model = (version, model, mtime)
+
+    finish = time.perf_counter()
+    print(f"Swapped in general model {version} in {finish - start} seconds")
+
+    return True
+
+
+def start_general_model_reload() -> bool:
+    """
+    Reloads the general model in the background. Returns False if a reload is
+    already in progress.
+    """
+    if _reload_lock.locked():
+        return False
+
+    def reload() -> None:
+        try:
+            reload_general_model()
+        except Exception as e:
+            print(e, file=sys.stderr)
+            print("Failed to reload general model", file=sys.stderr)
+
+    threading.Thread(target=reload, daemon=True).start()
+
+    return True
+
+
+def start_general_model_watcher(
+    load_path: str = GENERAL_MODEL_PATH, interval: int = GENERAL_MODEL_WATCH_INTERVAL
+) -> None:
+    """
+    Swaps in general models reloaded by other worker processes.
+    """
+    global _watcher_pid
+
+    with _general_model_lock:
+        if _watcher_pid == os.getpid():
+            return
+        _watcher_pid = os.getpid()
+
+    def watch() -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                entry = _general_model
+                if entry is None or _reload_lock.locked():
+                    continue
+
+                # Reloads the model if its file was replaced
+                if os.stat(load_path).st_mtime_ns != entry[2]:
+                    reload_general_model(load_path=load_path)
+            except Exception as e:
+                print(e, file=sys.stderr)
+                print("Failed to check general model file", file=sys.stderr)
+
+    threading.Thread(target=watch, daemon=True).start()
@@ -0,0 +1,324 @@
+from collections import OrderedDict
+from dotenv import load_dotenv
+import fcntl
+import glob
+import hashlib
+import numpy as np
+import os
+import pandas as pd
+import pickle
+import sys
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(project_root)
+
+load_dotenv()
+
+MODEL_CACHE_PATH = os.getenv("MODEL_CACHE_PATH", "./data/models")
+
+# Number of models kept in memory by each worker
+MODEL_CACHE_SIZE = int(os.getenv("MODEL_CACHE_SIZE", 32))
+
+# Number of models kept on disk across workers
+MODEL_CACHE_DISK_SIZE = int(os.getenv("MODEL_CACHE_DISK_SIZE", 2000))
+
+# Number of scored catalogs kept in memory by each worker
+SCORE_CACHE_SIZE = int(os.getenv("SCORE_CACHE_SIZE", 16))
+
+# Number of scored catalogs kept on disk across workers
+SCORE_CACHE_DISK_SIZE = int(os.getenv("SCORE_CACHE_DISK_SIZE", 500))
+
+_models: OrderedDict[str, Any] = OrderedDict()
+_models_lock = threading.Lock()
+_scores: OrderedDict[str, np.ndarray] = OrderedDict()
+_scores_lock = threading.Lock()
+
+
+def reset_model_cache_lock() -> None:
+    """
+    Recreates the model and score cache locks in a forked worker.
+    """
+    global _models_lock, _scores_lock
+
+    _models_lock = threading.Lock()
+    _scores_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=reset_model_cache_lock)
+
+
+def get_profile_hash(user_df: pd.DataFrame) -> str:
+    """
+    Gets a content hash of a user's (movie_id, rating) pairs.
+    """
+    movie_ids = user_df["movie_id"].to_numpy(dtype="int64")
+    ratings = user_df["user_rating"].to_numpy(dtype="float64")
+
+    # Orders pairs so the hash ignores rating order
+    order = np.lexsort((ratings, movie_ids))
+    digest = hashlib.sha256()
+    digest.update(movie_ids[order].tobytes())
+    digest.update(ratings[order].tobytes())
+
+    return digest.hexdigest()
+
+
+def get_model_cache_key(user_df: pd.DataFrame, model_version: str) -> str:
+    """
+    Gets the cache key of a model trained on a user's ratings.
+    """
+    return f"{model_version}-{get_profile_hash(user_df=user_df)}"
+
+
+def get_rating_pairs(user_df: pd.DataFrame) -> Dict[int, float]:
+    """
+    Gets a user's ratings by movie_id.
+    """
+    return dict(
+        zip(
+            user_df["movie_id"].to_numpy(dtype="int64").tolist(),
+            user_df["user_rating"].to_numpy(dtype="float64").tolist(),
+        )
+    )
+
+
+def get_model_cache_file(key: str, path: str = MODEL_CACHE_PATH) -> str:
+    """
+    Gets the on-disk location of a cached model.
+    """
+    return os.path.join(path, f"{key}.pkl")
+
+
+def get_cached_model(key: str, path: str = MODEL_CACHE_PATH) -> Any | None:
+    """
+    Gets a cached model from memory, then from disk.
+    """
+    with _models_lock:
+        if key in _models:
+            _models.move_to_end(key)
+            return _models[key]
+
+    try:
+        file = get_model_cache_file(key=key, path=path)
+        with open(file, "rb") as f:
+            model = pickle.load(f)
+
+        # Marks the model as recently used for pruning
+        os.utime(file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print("Failed to load cached model", file=sys.stderr)
+        return None
+
+    add_memory_model(key=key, model=model)
+
+    return model
+
+
+def add_memory_model(key: str, model: Any) -> None:
+    """
+    Adds a model to the in-memory cache, evicting the least recently used model.
+    """
+    with _models_lock:
+        _models[key] = model
+        _models.move_to_end(key)
+        while len(_models) > MODEL_CACHE_SIZE:
+            _models.popitem(last=False)
+
+
+def cache_model(key: str, model: Any, path: str = MODEL_CACHE_PATH) -> None:
+    """
+    Adds a model to the in-memory and on-disk caches.
+    """
+    add_memory_model(key=key, model=model)
+
+    try:
+        os.makedirs(path, exist_ok=True)
+
+        # Writes to a temporary file so other workers never see a partial model
+        file = get_model_cache_file(key=key, path=path)
+        temp_file = f"{file}.{os.getpid()}.tmp"
+        with open(temp_file, "wb") as f:
+            pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, file)
+
+        prune_model_cache(path=path)
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print("Failed to write model to cache", file=sys.stderr)
+
+
+def prune_model_cache(
+    path: str = MODEL_CACHE_PATH, pattern: str = "*.pkl", max_files: int | None = None
+) -> None:
+    """
+    Removes the least recently used files beyond the on-disk cache size.
+    """
+    if max_files is None:
+        max_files = MODEL_CACHE_DISK_SIZE
+
+    files = glob.glob(os.path.join(path, pattern))
+    if len(files) <= max_files:
+        return
+
+    files.sort(key=lambda file: os.stat(file).st_mtime)
+    for file in files[: len(files) - max_files]:
+        try:
+            os.remove(file)
+        except FileNotFoundError:
+            pass
+
+
+def clear_model_cache() -> None:
+    """
+    Clears the in-memory model and score caches.
+    """
+    with _models_lock:
+        _models.clear()
+    with _scores_lock:
+        _scores.clear()
+
+
+def get_scores_cache_file(key: str, path: str = MODEL_CACHE_PATH) -> str:
+    """
+    Gets the on-disk location of a cached scored catalog.
+    """
+    return os.path.join(path, "scores", f"{key}.npy")
+
+
+def get_cached_scores(key: str, path: str = MODEL_CACHE_PATH) -> np.ndarray | None:
+    """
+    Gets a cached scored catalog from memory, then memory-maps it from disk.
+    """
+    with _scores_lock:
+        if key in _scores:
+            _scores.move_to_end(key)
+            return _scores[key]
+
+    try:
+        file = get_scores_cache_file(key=key, path=path)
+        scores = np.load(file, mmap_mode="r")
+
+        # Marks the scores as recently used for pruning
+        os.utime(file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print("Failed to load cached scores", file=sys.stderr)
+        return None
+
+    add_memory_scores(key=key, scores=scores)
+
+    return scores
+
+
+def add_memory_scores(key: str, scores: np.ndarray) -> None:
+    """
+    Adds a scored catalog to the in-memory cache, evicting the least recently
+    used scores.
+    """
+    with _scores_lock:
+        _scores[key] = scores
+        _scores.move_to_end(key)
+        while len(_scores) > SCORE_CACHE_SIZE:
+            _scores.popitem(last=False)
+
+
+def cache_scores(key: str, scores: np.ndarray, path: str = MODEL_CACHE_PATH) -> None:
+    """
+    Adds a scored catalog to the in-memory and on-disk caches.
+    """
+    add_memory_scores(key=key, scores=scores)
+
+    try:
+        file = get_scores_cache_file(key=key, path=path)
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+
+        # Writes to a temporary file so other workers never see partial scores
+        temp_file = f"{file}.{os.getpid()}.tmp"
+        with open(temp_file, "wb") as f:
+            np.save(f, scores)
+        os.replace(temp_file, file)
+
+        prune_model_cache(
+            path=os.path.dirname(file), pattern="*.npy", max_files=SCORE_CACHE_DISK_SIZE
+        )
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print("Failed to write scores to cache", file=sys.stderr)
+
+
+def get_shared_scores(
+    key: str, score: Callable[[], np.ndarray], path: str = MODEL_CACHE_PATH
+) -> np.ndarray:
+    """
+    Gets cached scores, computing them in only one worker process while the
+    others wait and memory-map the result.
+    """
+    scores = get_cached_scores(key=key, path=path)
+    if scores is not None:
+        return scores
+
+    scores_path = os.path.dirname(get_scores_cache_file(key=key, path=path))
+    os.makedirs(scores_path, exist_ok=True)
+    with open(os.path.join(scores_path, "scores.lock"), "a") as lock_file:
+        # Holds the lock until the file closes, even if scoring fails
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+        scores = get_cached_scores(key=key, path=path)
+        if scores is None:
+            scores = score()
+            cache_scores(key=key, scores=scores, path=path)
+
+    return scores
+
+
+def get_user_profile_file(user: str, path: str = MODEL_CACHE_PATH) -> str:
+    """
+    Gets the on-disk location of a user's latest cached rating profile.
+    """
+    return os.path.join(
+        path, "users", f"{hashlib.sha256(user.encode()).hexdigest()[:32]}.pkl"
+    )
+
+
+def get_user_profile(
+    user: str, path: str = MODEL_CACHE_PATH
+) -> Tuple[str, Dict[int, float]] | None:
+    """
+    Gets the cache key and ratings of the latest model cached for a user.
+    """
+    try:
+        with open(get_user_profile_file(user=user, path=path), "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print(f"Failed to load {user}'s cached rating profile", file=sys.stderr)
+        return None
+
+
+def set_user_profile(
+    user: str, key: str, user_df: pd.DataFrame, path: str = MODEL_CACHE_PATH
+) -> None:
+    """
+    Records the cache key and ratings of the latest model cached for a user.
+    """
+    try:
+        file = get_user_profile_file(user=user, path=path)
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+
+        # Writes to a temporary file so other workers never see a partial profile
+        temp_file = f"{file}.{os.getpid()}.tmp"
+        with open(temp_file, "wb") as f:
+            pickle.dump((key, get_rating_pairs(user_df=user_df)), f)
+        os.replace(temp_file, file)
+    except Exception as e:
+        print(e, file=sys.stderr)
+        print(f"Failed to write {user}'s rating profile to cache", file=sys.stderr)
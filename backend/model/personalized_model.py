@@ -1,16 +1,140 @@
+import asyncio
+import copy
 import numpy as np
 import os
 import pandas as pd
+import random
+from sklearn.base import BaseEstimator
 from sklearn.ensemble import RandomForestRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import Ridge
 from sklearn.metrics import root_mean_squared_error
 from sklearn.model_selection import train_test_split
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
 import sys
-from typing import Tuple
+import threading
+from typing import Dict, Literal, Tuple, TYPE_CHECKING
 
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.append(project_root)
 
-from data_processing.utils import GENRES
+from data_processing.utils import FEATURE_COLUMNS, GENRES
+from infra.cpu_worker import run_in_worker
+from model.anytime_prediction import predict_anytime
+from model.general_model import get_general_model, get_versioned_general_model
+from model.model_cache import (
+    cache_model,
+    cache_scores,
+    get_cached_model,
+    get_cached_scores,
+    get_model_cache_key,
+    get_rating_pairs,
+    get_user_profile,
+    set_user_profile,
+)
+
+if TYPE_CHECKING:
+    from data_processing.catalog import MovieCatalog
+
+# Version of the personalized model, changed whenever training changes
+PERSONALIZED_MODEL_VERSION = "tiered-3"
+
+PersonalizedModelTier = Literal[
+    "ridge", "residual_forest", "medium_forest", "large_forest"
+]
+
+# Minimum number of ratings of each personalized model tier
+PERSONALIZED_MODEL_TIERS = {
+    "ridge": 0,
+    "residual_forest": 20,
+    "medium_forest": 250,
+    "large_forest": 1000,
+}
+
+# Maximum number of ratings used to fit the personalized model
+MAX_TRAINING_RATINGS = int(os.getenv("PERSONALIZED_MAX_TRAINING_RATINGS", 3000))
+
+# Largest fraction of new ratings added to a cached model instead of retraining
+INCREMENTAL_MAX_DRIFT = float(os.getenv("PERSONALIZED_INCREMENTAL_MAX_DRIFT", 0.05))
+
+# Number of trees added to a cached forest per incremental update
+INCREMENTAL_TREES = 10
+
+# Fraction of served models whose quality metrics are sampled
+METRICS_SAMPLE_RATE = float(os.getenv("PERSONALIZED_METRICS_SAMPLE_RATE", 0.05))
+
+_scoring_keys: set[str] = set()
+_scoring_lock = threading.Lock()
+
+
+def reset_scoring_lock() -> None:
+    """
+    Recreates the catalog scoring lock in a forked worker, which scores nothing
+    in the background.
+    """
+    global _scoring_keys, _scoring_lock
+
+    _scoring_keys = set()
+    _scoring_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=reset_scoring_lock)
+
+
+class ResidualModel(BaseEstimator):
+    """
+    Personalized model that corrects the general model's catalog scores with a
+    small model of the user's residuals.
+    """
+
+    def __init__(self, residual_model: BaseEstimator) -> None:
+        self.residual_model = residual_model
+
+    def get_general_scores(
+        self, X: pd.DataFrame, general_scores: np.ndarray | None = None
+    ) -> np.ndarray:
+        """
+        Gets the general model's scores of rows, predicting only the rows
+        without a precomputed catalog score.
+        """
+        if general_scores is None:
+            return get_general_model().predict(X)
+
+        scores = np.asarray(general_scores, dtype="float64")
+        is_missing = np.isnan(scores)
+        if is_missing.any():
+            scores = scores.copy()
+            scores[is_missing] = get_general_model().predict(X[is_missing])
+
+        return scores
+
+    def fit(
+        self,
+        X: pd.DataFrame,
+        y: pd.Series,
+        general_scores: np.ndarray | None = None,
+    ) -> "ResidualModel":
+        """
+        Fits the residual model on the user's ratings minus the general model's
+        scores.
+        """
+        self.residual_model.fit(
+            X, y - self.get_general_scores(X=X, general_scores=general_scores)
+        )
+
+        return self
+
+    def predict(
+        self, X: pd.DataFrame, general_scores: np.ndarray | None = None
+    ) -> np.ndarray:
+        """
+        Predicts ratings as the general model's scores plus the user's
+        residuals.
+        """
+        return self.get_general_scores(
+            X=X, general_scores=general_scores
+        ) + self.residual_model.predict(X)
 
 
 def prepare_personalized_features(X: pd.DataFrame) -> pd.DataFrame:
@@ -68,43 +192,203 @@ def prepare_personalized_features(X: pd.DataFrame) -> pd.DataFrame:
     return X
 
 
+def get_personalized_model_tier(num_ratings: int) -> PersonalizedModelTier:
+    """
+    Gets the largest personalized model tier justified by a number of ratings.
+    """
+    return max(
+        (
+            tier
+            for tier, minimum in PERSONALIZED_MODEL_TIERS.items()
+            if num_ratings >= minimum
+        ),
+        key=PERSONALIZED_MODEL_TIERS.get,
+    )
+
+
+def create_personalized_model(tier: PersonalizedModelTier) -> BaseEstimator:
+    """
+    Creates an untrained personalized model of a tier.
+    """
+    if tier == "ridge":
+        return make_pipeline(
+            SimpleImputer(strategy="median"), StandardScaler(), Ridge(alpha=10.0)
+        )
+    elif tier == "residual_forest":
+        return ResidualModel(
+            residual_model=RandomForestRegressor(
+                random_state=0, max_depth=5, min_samples_split=10, n_estimators=20
+            )
+        )
+    elif tier == "medium_forest":
+        return RandomForestRegressor(
+            random_state=0, max_depth=8, min_samples_split=10, n_estimators=60
+        )
+    elif tier == "large_forest":
+        return RandomForestRegressor(
+            random_state=0, max_depth=10, min_samples_split=10, n_estimators=100
+        )
+    else:
+        raise ValueError(f"Unknown personalized model tier: {tier}")
+
+
+def fit_personalized_rows(
+    model: BaseEstimator,
+    X: pd.DataFrame,
+    y: pd.Series,
+    rows: np.ndarray,
+    general_scores: np.ndarray | None = None,
+) -> BaseEstimator:
+    """
+    Fits a personalized model on rows of a user's ratings, passing residual
+    models the general scores of those rows.
+    """
+    if isinstance(model, ResidualModel):
+        return model.fit(
+            X.iloc[rows],
+            y.iloc[rows],
+            general_scores=None if general_scores is None else general_scores[rows],
+        )
+
+    return model.fit(X.iloc[rows], y.iloc[rows])
+
+
+def predict_personalized(
+    model: BaseEstimator, X: pd.DataFrame, general_scores: np.ndarray | None = None
+) -> np.ndarray:
+    """
+    Predicts with a personalized model, passing residual models the general
+    scores of the rows.
+    """
+    if isinstance(model, ResidualModel):
+        return model.predict(X, general_scores=general_scores)
+
+    return model.predict(X)
+
+
+def predict_personalized_anytime(
+    model: BaseEstimator,
+    X: pd.DataFrame,
+    k: int,
+    general_scores: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Predicts with a personalized model tree by tree, adding the general scores
+    of the rows to the partial residuals of residual models.
+    """
+    if isinstance(model, ResidualModel):
+        return predict_anytime(
+            model=model.residual_model,
+            X=X,
+            k=k,
+            offset=model.get_general_scores(X=X, general_scores=general_scores),
+        )
+
+    return predict_anytime(model=model, X=X, k=k)
+
+
+def get_catalog_general_scores(
+    model: BaseEstimator, catalog: "MovieCatalog", row_ids: np.ndarray | pd.Series
+) -> np.ndarray | None:
+    """
+    Gets the catalog's general scores of rows for residual models, which
+    correct them, and None for other models.
+    """
+    if not isinstance(model, ResidualModel):
+        return None
+
+    return catalog.get_general_scores()[np.asarray(row_ids)]
+
+
+def sample_training_rows(
+    X: pd.DataFrame, y: pd.Series, max_ratings: int | None = MAX_TRAINING_RATINGS
+) -> np.ndarray:
+    """
+    Gets the positions of at most max_ratings ratings, sampled in proportion to
+    each (rating, release decade) stratum.
+    """
+    if max_ratings is None or len(y) <= max_ratings:
+        return np.arange(len(y))
+
+    # Assigns each rating to a stratum
+    decades = (X["release_year"].to_numpy(dtype="float64") // 10) * 10
+    strata, _ = pd.factorize(
+        pd.MultiIndex.from_arrays([y.to_numpy(dtype="float64"), decades]),
+        use_na_sentinel=False,
+    )
+
+    # Allocates the sample across strata by largest remainder
+    counts = np.bincount(strata)
+    exact = counts * max_ratings / len(y)
+    quotas = np.floor(exact).astype("int64")
+    remainder = max_ratings - quotas.sum()
+    quotas[np.argsort(quotas - exact, kind="stable")[:remainder]] += 1
+
+    # Samples each stratum without replacement
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(y))
+    ranks = pd.Series(strata[order]).groupby(strata[order]).cumcount().to_numpy()
+
+    return np.sort(order[ranks < quotas[strata[order]]])
+
+
 def train_personalized_model(
-    user_df: pd.DataFrame, verbose: bool = False
-) -> Tuple[RandomForestRegressor, float, float, float, float]:
+    user_df: pd.DataFrame,
+    verbose: bool = False,
+    features: pd.DataFrame | None = None,
+    tier: PersonalizedModelTier | None = None,
+    max_ratings: int | None = MAX_TRAINING_RATINGS,
+    general_scores: np.ndarray | None = None,
+) -> Tuple[BaseEstimator, float, float, float, float]:
     """
-    Trains personalized model.
+    Trains personalized model with evaluation splits and metrics, optionally on
+    precomputed catalog features and general scores. Uses the tier for the
+    user's number of ratings unless a tier is given, and fits on at most
+    max_ratings of the training split.
     """
     # Prepares user feature data
-    X = prepare_personalized_features(X=user_df)
+    if features is None:
+        X = prepare_personalized_features(X=user_df)
+    else:
+        X = features
 
     # Creates user target data
     y = user_df["user_rating"]
 
+    # Marks general scores as missing so residual models predict them
+    if general_scores is None:
+        general_scores = np.full(len(y), np.nan)
+
     # Creates train-test split
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=0
+    X_train, X_test, y_train, y_test, general_train, general_test = train_test_split(
+        X, y, general_scores, test_size=0.2, random_state=0
     )
 
     # Creates test-validation split
-    X_test, X_val, y_test, y_val = train_test_split(
-        X_test, y_test, test_size=0.5, random_state=0
+    X_test, X_val, y_test, y_val, general_test, general_val = train_test_split(
+        X_test, y_test, general_test, test_size=0.5, random_state=0
     )
 
     # Initializes personalized model
-    model = RandomForestRegressor(
-        random_state=0, max_depth=10, min_samples_split=10, n_estimators=100
+    model = create_personalized_model(
+        tier=tier or get_personalized_model_tier(num_ratings=len(user_df))
     )
 
-    # Fits personalized model on user training data
-    model.fit(X_train, y_train)
+    # Fits personalized model on a bounded sample of user training data
+    rows = sample_training_rows(X=X_train, y=y_train, max_ratings=max_ratings)
+    fit_personalized_rows(
+        model=model, X=X_train, y=y_train, rows=rows, general_scores=general_train
+    )
 
     # Calculates mse on test data
-    y_pred_test = model.predict(X_test)
+    y_pred_test = predict_personalized(
+        model=model, X=X_test, general_scores=general_test
+    )
     rmse_test = root_mean_squared_error(y_test, y_pred_test)
     rounded_rmse_test = root_mean_squared_error(y_test, np.round(y_pred_test * 2) / 2)
 
     # Calculates mse on validation data
-    y_pred_val = model.predict(X_val)
+    y_pred_val = predict_personalized(model=model, X=X_val, general_scores=general_val)
     rmse_val = root_mean_squared_error(y_val, y_pred_val)
     rounded_rmse_val = root_mean_squared_error(y_val, np.round(y_pred_val * 2) / 2)
 
@@ -119,3 +403,331 @@ def train_personalized_model(
         # print(results_df)
 
     return model, rmse_test, rounded_rmse_test, rmse_val, rounded_rmse_val
+
+
+def fit_personalized_model(
+    user_df: pd.DataFrame,
+    features: pd.DataFrame | None = None,
+    general_scores: np.ndarray | None = None,
+) -> BaseEstimator:
+    """
+    Fits the serving personalized model on all of a user's ratings, without
+    evaluation splits.
+    """
+    # Prepares user feature data
+    if features is None:
+        X = prepare_personalized_features(X=user_df)
+    else:
+        X = features
+
+    # Fits personalized model on a bounded sample of all user data
+    model = create_personalized_model(
+        tier=get_personalized_model_tier(num_ratings=len(user_df))
+    )
+    y = user_df["user_rating"]
+    rows = sample_training_rows(X=X, y=y, max_ratings=MAX_TRAINING_RATINGS)
+    fit_personalized_rows(
+        model=model, X=X, y=y, rows=rows, general_scores=general_scores
+    )
+
+    return model
+
+
+def get_updatable_forest(model: BaseEstimator) -> RandomForestRegressor | None:
+    """
+    Gets the forest of a personalized model that new trees can be added to.
+    """
+    forest = model.residual_model if isinstance(model, ResidualModel) else model
+
+    return forest if isinstance(forest, RandomForestRegressor) else None
+
+
+def can_update_personalized_model(
+    model: BaseEstimator,
+    previous_ratings: Dict[int, float],
+    user_df: pd.DataFrame,
+) -> bool:
+    """
+    Determines if a cached model of a user's previous ratings can be updated
+    with trees instead of retrained. Requires that ratings were only added,
+    that the new ratings stay under the drift threshold, that the profile stays
+    in the same tier, and that updates have not doubled the forest.
+    """
+    forest = get_updatable_forest(model=model)
+    if forest is None:
+        return False
+
+    # Checks that no previous rating was removed or changed
+    ratings = get_rating_pairs(user_df=user_df)
+    if any(
+        ratings.get(movie_id) != rating for movie_id, rating in previous_ratings.items()
+    ):
+        return False
+
+    # Checks the drift since the cached model
+    num_new = len(ratings) - len(previous_ratings)
+    if num_new == 0 or num_new > INCREMENTAL_MAX_DRIFT * len(previous_ratings):
+        return False
+
+    # Checks that the profile size still maps to the cached model's tier
+    tier = get_personalized_model_tier(num_ratings=len(ratings))
+    if tier != get_personalized_model_tier(num_ratings=len(previous_ratings)):
+        return False
+
+    initial_forest = get_updatable_forest(model=create_personalized_model(tier=tier))
+
+    return forest.n_estimators + INCREMENTAL_TREES <= 2 * initial_forest.n_estimators
+
+
+def update_personalized_model(
+    model: BaseEstimator,
+    user_df: pd.DataFrame,
+    features: pd.DataFrame | None = None,
+    general_scores: np.ndarray | None = None,
+) -> BaseEstimator:
+    """
+    Adds trees fitted on all of a user's ratings to a copy of a cached model.
+    """
+    # Prepares user feature data
+    if features is None:
+        X = prepare_personalized_features(X=user_df)
+    else:
+        X = features
+
+    # Grows a copy of the forest so the cached model is never modified
+    model = copy.deepcopy(model)
+    forest = get_updatable_forest(model=model)
+    forest.set_params(
+        warm_start=True, n_estimators=forest.n_estimators + INCREMENTAL_TREES
+    )
+
+    # Fits the new trees on a bounded sample of all user data
+    y = user_df["user_rating"]
+    rows = sample_training_rows(X=X, y=y, max_ratings=MAX_TRAINING_RATINGS)
+    fit_personalized_rows(
+        model=model, X=X, y=y, rows=rows, general_scores=general_scores
+    )
+
+    return model
+
+
+def start_personalized_model_evaluation(
+    user_df: pd.DataFrame,
+    features: pd.DataFrame | None = None,
+    general_scores: np.ndarray | None = None,
+) -> None:
+    """
+    Samples the quality metrics of the personalized model in the background.
+    """
+    if random.random() >= METRICS_SAMPLE_RATE:
+        return
+
+    def evaluate() -> None:
+        try:
+            _, rmse_test, _, rmse_val, _ = asyncio.run(
+                run_in_worker(
+                    train_personalized_model,
+                    user_df=user_df,
+                    features=features,
+                    general_scores=general_scores,
+                )
+            )
+            print(
+                f"Evaluated personalized model on {len(user_df)} ratings "
+                f"with test RMSE {rmse_test} and validation RMSE {rmse_val}"
+            )
+        except Exception as e:
+            print(e, file=sys.stderr)
+            print("Failed to evaluate personalized model", file=sys.stderr)
+
+    threading.Thread(target=evaluate, daemon=True).start()
+
+
+def get_personalized_model_version(num_ratings: int) -> str:
+    """
+    Gets the version of a user's personalized model, which includes the general
+    model version only for residual models since they correct the general model.
+    """
+    if get_personalized_model_tier(num_ratings=num_ratings) != "residual_forest":
+        return PERSONALIZED_MODEL_VERSION
+
+    general_version, _ = get_versioned_general_model()
+
+    return f"{PERSONALIZED_MODEL_VERSION}-{general_version}"
+
+
+async def get_personalized_model(
+    user_df: pd.DataFrame,
+    catalog: "MovieCatalog | None" = None,
+    user: str | None = None,
+) -> BaseEstimator:
+    """
+    Gets the personalized model of a user's ratings, trained on catalog
+    features if a catalog is given. Reuses a cached model of the same ratings,
+    updates the cached model of the user's previous ratings if only a few were
+    added, and otherwise trains a model in a worker process.
+    """
+    model_version = await asyncio.to_thread(
+        get_personalized_model_version, num_ratings=len(user_df)
+    )
+    key = get_model_cache_key(user_df=user_df, model_version=model_version)
+    model = get_cached_model(key=key)
+    if model is not None:
+        return model
+
+    # Gathers the user's catalog features, and general scores for residual models
+    features = None
+    general_scores = None
+    if catalog is not None:
+        row_ids = user_df["row_id"].to_numpy()
+        features = catalog.get_features(row_ids=row_ids)
+        if get_personalized_model_tier(num_ratings=len(user_df)) == "residual_forest":
+            general_scores = (await asyncio.to_thread(catalog.get_general_scores))[
+                row_ids
+            ]
+
+    # Updates the model of the user's previous ratings
+    previous_profile = get_user_profile(user=user) if user is not None else None
+    if previous_profile is not None:
+        previous_key, previous_ratings = previous_profile
+        previous_model = None
+        if previous_key.startswith(f"{model_version}-"):
+            previous_model = get_cached_model(key=previous_key)
+        if previous_model is not None and can_update_personalized_model(
+            model=previous_model, previous_ratings=previous_ratings, user_df=user_df
+        ):
+            model = await run_in_worker(
+                update_personalized_model,
+                model=previous_model,
+                user_df=user_df,
+                features=features,
+                general_scores=general_scores,
+            )
+            print(f"Updated {user}'s personalized model with new ratings")
+
+    # Trains a new model
+    if model is None:
+        model = await run_in_worker(
+            fit_personalized_model,
+            user_df=user_df,
+            features=features,
+            general_scores=general_scores,
+        )
+        start_personalized_model_evaluation(
+            user_df=user_df, features=features, general_scores=general_scores
+        )
+
+    await asyncio.to_thread(cache_model, key=key, model=model)
+    if user is not None:
+        await asyncio.to_thread(set_user_profile, user=user, key=key, user_df=user_df)
+
+    return model
+
+
+def score_catalog(
+    model: BaseEstimator,
+    features: np.ndarray,
+    general_scores: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Predicts a user's rating of every catalog movie.
+    """
+    # Copies the read-only catalog features, since scikit-learn validation needs a
+    # writable contiguous array
+    X = pd.DataFrame(features, columns=FEATURE_COLUMNS, copy=True)
+
+    return predict_personalized(model=model, X=X, general_scores=general_scores).astype(
+        "float32"
+    )
+
+
+async def score_personalized_catalog(
+    model: BaseEstimator, catalog: "MovieCatalog", key: str
+) -> np.ndarray:
+    """
+    Predicts a user's rating of every catalog movie with the full model and
+    caches the scores.
+    """
+    general_scores = await asyncio.to_thread(
+        get_catalog_general_scores,
+        model=model,
+        catalog=catalog,
+        row_ids=np.arange(len(catalog)),
+    )
+    scores = await run_in_worker(
+        score_catalog,
+        model=model,
+        features=catalog.features,
+        general_scores=general_scores,
+    )
+    await asyncio.to_thread(cache_scores, key=key, scores=scores)
+
+    return scores
+
+
+def start_personalized_catalog_scoring(
+    model: BaseEstimator, catalog: "MovieCatalog", key: str
+) -> None:
+    """
+    Scores the whole catalog in the background, once per scores cache key.
+    """
+    with _scoring_lock:
+        if key in _scoring_keys:
+            return
+        _scoring_keys.add(key)
+
+    def score() -> None:
+        try:
+            asyncio.run(
+                score_personalized_catalog(model=model, catalog=catalog, key=key)
+            )
+        except Exception as e:
+            print(e, file=sys.stderr)
+            print("Failed to score catalog with personalized model", file=sys.stderr)
+        finally:
+            with _scoring_lock:
+                _scoring_keys.discard(key)
+
+    threading.Thread(target=score, daemon=True).start()
+
+
+async def get_personalized_scores(
+    user_df: pd.DataFrame,
+    catalog: "MovieCatalog",
+    row_ids: np.ndarray,
+    k: int,
+    user: str | None = None,
+) -> np.ndarray:
+    """
+    Gets the personalized model's predicted rating of catalog rows. Catalog
+    scores are cached once per rating profile, model version, and catalog
+    version, so changing recommendation filters never repeats inference. Until
+    they are cached, the rows are scored tree by tree within the prediction
+    budget while the whole catalog is scored in the background.
+    """
+    model_version = await asyncio.to_thread(
+        get_personalized_model_version, num_ratings=len(user_df)
+    )
+    key = (
+        f"{get_model_cache_key(user_df=user_df, model_version=model_version)}"
+        f"-{catalog.version}"
+    )
+    scores = await asyncio.to_thread(get_cached_scores, key=key)
+    if scores is not None:
+        return scores[row_ids]
+
+    # Scores the requested rows without caching the partial ensemble
+    model = await get_personalized_model(user_df=user_df, catalog=catalog, user=user)
+    general_scores = await asyncio.to_thread(
+        get_catalog_general_scores, model=model, catalog=catalog, row_ids=row_ids
+    )
+    predicted_ratings = await run_in_worker(
+        predict_personalized_anytime,
+        model=model,
+        X=catalog.get_features(row_ids=row_ids),
+        k=k,
+        general_scores=general_scores,
+    )
+    start_personalized_catalog_scoring(model=model, catalog=catalog, key=key)
+
+    return predicted_ratings
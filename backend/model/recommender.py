@@ -1,4 +1,5 @@
 import aiohttp
+import asyncio
 import gc
 import numpy as np
 import os
@@ -9,17 +10,21 @@ from typing import Any, Dict, Literal, Sequence
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.append(project_root)
 
-from data_processing.utils import get_processed_user_df
+from data_processing.scrape_user_ratings import MIN_RATINGS
+from data_processing.utils import get_genre_mask, get_processed_user_df
+from infra.cpu_worker import run_in_worker
 from infra.custom_exceptions import (
     PredictionListException,
     RecommendationFilterException,
     UserProfileException,
     WatchlistEmptyException,
 )
-from model.general_model import load_general_model, prepare_general_features
 from model.personalized_model import (
-    prepare_personalized_features,
-    train_personalized_model,
+    get_catalog_general_scores,
+    get_personalized_model,
+    get_personalized_scores,
+    predict_personalized,
+    predict_personalized_anytime,
 )
 
 
@@ -49,9 +54,11 @@ async def recommend_n_movies(
         )
         raise ValueError("Number of recommendations must be an integer greater than 0")
 
-    # Loads processed user df, unrated movies, and movie data
+    # Loads processed user df, unrated movies, and movie catalog
     try:
-        processed_user_df, unrated, movie_data = await get_processed_user_df(user=user)
+        processed_user_df, unrated, catalog = await get_processed_user_df(
+            user=user, min_ratings=0
+        )
     except UserProfileException as e:
         print(e, file=sys.stderr)
         raise e
@@ -59,32 +66,25 @@ async def recommend_n_movies(
         print(e, file=sys.stderr)
         raise e
 
-    # Trains recommendation model on processed user data
-    if model_type == "personalized":
-        model, _, _, _, _ = train_personalized_model(user_df=processed_user_df)
-        print(f"Created {user}'s personalized recommendation model")
-    elif model_type == "general":
-        model = load_general_model()
+    # Serves users with too few ratings from the general model
+    if model_type == "personalized" and len(processed_user_df) < MIN_RATINGS:
+        print(f"{user} has not rated enough movies, using general model")
+        model_type = "general"
 
     # Gets recommendation pool for user
-    merged = (
-        movie_data.reset_index()
-        .merge(
-            processed_user_df[["title", "release_year", "runtime"]],
-            on=["title", "release_year", "runtime"],
-            how="left",
-            indicator=True,
-        )
-        .set_index("index")
-    )
-
-    initial_mask = pd.Series(True, index=movie_data.index)
+    movie_data = catalog.frame
+    initial_mask = np.ones(len(catalog), dtype="bool")
 
     # Filters out previously watched movies
     if not allow_rewatches:
-        initial_mask &= ~movie_data["movie_id"].isin(processed_user_df["movie_id"])
-        initial_mask &= ~movie_data["movie_id"].isin(unrated)
-        initial_mask &= merged["_merge"].eq("left_only")
+        unrated_rows = catalog.get_rows_by_movie_id(movie_ids=unrated)
+        initial_mask[unrated_rows[unrated_rows >= 0]] = False
+
+        # Filters out rated movies and their duplicate releases
+        canonical_ids = movie_data["canonical_id"].to_numpy()
+        is_watched = np.zeros(catalog.num_canonical_ids, dtype="bool")
+        is_watched[canonical_ids[processed_user_df["row_id"].to_numpy()]] = True
+        initial_mask &= ~is_watched[canonical_ids]
 
     # Excludes watchlist
     if not include_watchlist:
@@ -107,39 +107,20 @@ async def recommend_n_movies(
         if watchlist is None:
             print("Failed to exclude watchlist due to error", file=sys.stderr)
         else:
-            initial_mask &= ~movie_data["url"].isin(watchlist)
-
-    pool = movie_data.loc[initial_mask].copy()
-
-    del processed_user_df, unrated, merged
-    gc.collect()
+            watchlist_rows = catalog.get_rows_by_url(urls=watchlist)
+            initial_mask[watchlist_rows[watchlist_rows >= 0]] = False
 
     # Included genres
-    included_genres = [f"is_{genre}" for genre in genres]
+    included_genre_mask = get_genre_mask(genres=genres)
 
     # Special genre filters
-    special_genres = [
-        genre
-        for genre in ["is_animation", "is_horror", "is_documentary"]
-        if genre not in included_genres
-    ]
-
-    # Creates popularity mask
-    low_cutoff = 25000
-    high_cutoff = 100000
-
-    popularity_mask = pd.Series(False, index=pool.index)
-    if "low" in popularity:
-        popularity_mask |= pool["letterboxd_rating_count"] <= low_cutoff
-    if "medium" in popularity:
-        popularity_mask |= (pool["letterboxd_rating_count"] > low_cutoff) & (
-            pool["letterboxd_rating_count"] <= high_cutoff
-        )
-    if "high" in popularity:
-        popularity_mask |= pool["letterboxd_rating_count"] > high_cutoff
-
-    del movie_data
-    gc.collect()
+    special_genre_mask = get_genre_mask(
+        genres=[
+            genre
+            for genre in ["animation", "horror", "documentary"]
+            if genre not in genres
+        ]
+    )
 
     # Minimum rating threshold
     if highly_rated:
@@ -147,50 +128,54 @@ async def recommend_n_movies(
     else:
         minimum_rating_threshold = 0
 
-    # Applies all filters
-    pool = pool[
-        pool[included_genres].any(axis=1)
-        & pool[special_genres].eq(0).all(axis=1)
-        & pool["content_type"].isin(content_types)
-        & (pool["release_year"] >= min_release_year)
-        & (pool["release_year"] <= max_release_year)
-        & (pool["runtime"] >= min_runtime)
-        & (pool["runtime"] <= max_runtime)
-        & popularity_mask
-        & (pool["letterboxd_rating"] >= minimum_rating_threshold)
+    # Resolves numeric and popularity filters to catalog rows
+    rows = catalog.get_filtered_rows(
+        ranges={
+            "release_year": (min_release_year, max_release_year),
+            "runtime": (min_runtime, max_runtime),
+            "letterboxd_rating": (minimum_rating_threshold, None),
+        },
+        popularity=popularity,
+    )
+
+    # Applies remaining filters to matching rows
+    packed_genres = movie_data["genres"].to_numpy()[rows]
+    rows = rows[
+        ((packed_genres & included_genre_mask) != 0)
+        & ((packed_genres & special_genre_mask) == 0)
+        & movie_data["content_type"].iloc[rows].isin(content_types).to_numpy()
+        & initial_mask[rows]
     ]
+    pool = movie_data.iloc[rows].copy()
+
+    del unrated, movie_data
+    gc.collect()
 
     if len(pool) == 0:
         print("No movies fit within the filter criteria", file=sys.stderr)
         raise RecommendationFilterException("No movies fit within the filter criteria")
 
-    # Prepares pool feature data
-    if model_type == "personalized":
-        X_pool = prepare_personalized_features(X=pool)
-    elif model_type == "general":
-        X_pool = prepare_general_features(X=pool)
-
     # Predicts user ratings for pool movies
-    predicted_ratings = model.predict(X_pool)
-    del X_pool
+    if model_type == "general":
+        predicted_ratings = catalog.get_general_scores()[pool["row_id"].to_numpy()]
+    else:
+        predicted_ratings = await get_personalized_scores(
+            user_df=processed_user_df,
+            catalog=catalog,
+            row_ids=pool["row_id"].to_numpy(),
+            k=num_recs,
+            user=user,
+        )
+        print(f"Loaded {user}'s personalized recommendation scores")
+    del processed_user_df
     gc.collect()
 
-    # Trims predicted ratings to acceptable range
-    pool["predicted_rating"] = np.clip(predicted_ratings, 0.5, 5).astype("float32")
-
-    # Rounds predicted ratings to 2 decimals
-    pool["predicted_rating"] = pool["predicted_rating"].apply(
-        lambda x: "{:.2f}".format(round(x, 2))
+    # Ranks top recommendations from highest to lowest predicted rating
+    recommendations = rank_top_k(
+        pool=pool, predicted_ratings=predicted_ratings, k=num_recs
     )
 
-    # Sorts recommendations from highest to lowest predicted rating
-    recommendations = pool.sort_values(
-        by="predicted_rating", ascending=False
-    ).drop_duplicates(subset=["title", "release_year", "runtime"])[
-        ["title", "poster", "release_year", "predicted_rating", "url"]
-    ]
-
-    return {"username": user, "recommendations": recommendations.iloc[:num_recs]}
+    return {"username": user, "recommendations": recommendations}
 
 
 async def recommend_n_watchlist_movies(
@@ -206,9 +191,11 @@ async def recommend_n_watchlist_movies(
     if num_recs < 1:
         raise ValueError("Number of recommendations must be an integer greater than 0")
 
-    # Loads processed user df and movie data
+    # Loads processed user df and movie catalog
     try:
-        processed_user_df, _, movie_data = await get_processed_user_df(user=user)
+        processed_user_df, _, catalog = await get_processed_user_df(
+            user=user, min_ratings=0
+        )
     except UserProfileException as e:
         print(e, file=sys.stderr)
         raise e
@@ -216,12 +203,17 @@ async def recommend_n_watchlist_movies(
         print(e, file=sys.stderr)
         raise e
 
+    # Serves users with too few ratings from the general model
+    if model_type == "personalized" and len(processed_user_df) < MIN_RATINGS:
+        print(f"{user} has not rated enough movies, using general model")
+        model_type = "general"
+
     # Trains recommendation model on processed user data
     if model_type == "personalized":
-        model, _, _, _, _ = train_personalized_model(user_df=processed_user_df)
-        print(f"Created {user}'s personalized recommendation model")
-    elif model_type == "general":
-        model = load_general_model()
+        model = await get_personalized_model(
+            user_df=processed_user_df, catalog=catalog, user=user
+        )
+        print(f"Loaded {user}'s personalized recommendation model")
 
     # Collects movies on watchlist
     watchlist_pool = [
@@ -229,7 +221,11 @@ async def recommend_n_watchlist_movies(
         for url in watchlist_pool
         if url is not None
     ]
-    watchlist_movies = movie_data[movie_data["url"].isin(watchlist_pool)].copy()
+    watchlist_rows = catalog.get_rows_by_url(urls=watchlist_pool)
+    movie_data = catalog.frame
+    watchlist_movies = movie_data.iloc[
+        np.unique(watchlist_rows[watchlist_rows >= 0])
+    ].copy()
     del watchlist_pool, processed_user_df, movie_data
     gc.collect()
 
@@ -237,35 +233,74 @@ async def recommend_n_watchlist_movies(
         print(f"{user}'s watchlist is empty", file=sys.stderr)
         raise WatchlistEmptyException(f"{user}'s watchlist is empty")
 
-    # Prepares watchlist feature data
-    if model_type == "personalized":
-        X_watchlist = prepare_personalized_features(X=watchlist_movies)
-    elif model_type == "general":
-        X_watchlist = prepare_general_features(X=watchlist_movies)
-
     # Predicts user ratings for watchlist movies
-    predicted_ratings = model.predict(X_watchlist)
-    del X_watchlist
-    gc.collect()
+    if model_type == "general":
+        predicted_ratings = catalog.get_general_scores()[
+            watchlist_movies["row_id"].to_numpy()
+        ]
+    else:
+        X_watchlist = catalog.get_features(row_ids=watchlist_movies["row_id"])
+        general_scores = await asyncio.to_thread(
+            get_catalog_general_scores,
+            model=model,
+            catalog=catalog,
+            row_ids=watchlist_movies["row_id"],
+        )
+        predicted_ratings = await run_in_worker(
+            predict_personalized_anytime,
+            model=model,
+            X=X_watchlist,
+            k=num_recs,
+            general_scores=general_scores,
+        )
+        del X_watchlist
+        gc.collect()
 
-    # Trims predicted ratings to acceptable range
-    watchlist_movies["predicted_rating"] = np.clip(predicted_ratings, 0.5, 5).astype(
-        "float32"
+    # Ranks top recommendations from highest to lowest predicted rating
+    recommendations = rank_top_k(
+        pool=watchlist_movies, predicted_ratings=predicted_ratings, k=num_recs
     )
 
+    return {"username": user, "recommendations": recommendations}
+
+
+def rank_top_k(
+    pool: pd.DataFrame, predicted_ratings: np.ndarray, k: int
+) -> pd.DataFrame:
+    """
+    Selects the k highest rated movies of a pool, keeping one movie per
+    canonical id.
+    """
+    # Trims predicted ratings to acceptable range
+    scores = np.clip(predicted_ratings, 0.5, 5).astype("float32")
+    canonical_ids = pool["canonical_id"].to_numpy()
+
+    # Widens the partition until enough distinct movies are selected
+    num_candidates = min(len(scores), 2 * k)
+    while True:
+        if num_candidates < len(scores):
+            candidates = np.argpartition(-scores, num_candidates - 1)[:num_candidates]
+        else:
+            candidates = np.arange(len(scores))
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        # Keeps the highest rated movie of each canonical id
+        _, first = np.unique(canonical_ids[candidates], return_index=True)
+        selected = candidates[np.sort(first)[:k]]
+        if len(selected) == k or num_candidates == len(scores):
+            break
+        num_candidates = min(len(scores), 2 * num_candidates)
+
+    top_k = pool.iloc[selected][["title", "poster", "release_year", "url"]]
+
     # Rounds predicted ratings to 2 decimals
-    watchlist_movies["predicted_rating"] = watchlist_movies["predicted_rating"].apply(
-        lambda x: "{:.2f}".format(round(x, 2))
+    top_k.insert(
+        3,
+        "predicted_rating",
+        ["{:.2f}".format(round(x, 2)) for x in scores[selected].tolist()],
     )
 
-    # Sorts recommendations from highest to lowest predicted rating
-    recommendations = watchlist_movies.sort_values(
-        by="predicted_rating", ascending=False
-    ).drop_duplicates(subset=["title", "release_year", "runtime"])[
-        ["title", "poster", "release_year", "predicted_rating", "url"]
-    ]
-
-    return {"username": user, "recommendations": recommendations.iloc[:num_recs]}
+    return top_k
 
 
 def merge_recommendations(
@@ -331,9 +366,9 @@ async def predict_movies(user: str, prediction_list: Sequence[str]) -> Dict[str,
             "Number of predictions must be an integer between 1 and 10 (inclusive)"
         )
 
-    # Loads processed user df and movie data
+    # Loads processed user df and movie catalog
     try:
-        processed_user_df, _, movie_data = await get_processed_user_df(user=user)
+        processed_user_df, _, catalog = await get_processed_user_df(user=user)
     except UserProfileException as e:
         print(e, file=sys.stderr)
         raise e
@@ -342,51 +377,41 @@ async def predict_movies(user: str, prediction_list: Sequence[str]) -> Dict[str,
         raise e
 
     # Trains recommendation model on processed user data
-    model, _, _, _, _ = train_personalized_model(user_df=processed_user_df)
-    print(f"Created {user}'s personalized recommendation model")
-
-    # Gets prediction pool for user
-    merged = movie_data.merge(
-        processed_user_df[["title", "release_year", "runtime"]],
-        on=["title", "release_year", "runtime"],
-        how="left",
-        indicator=True,
+    model = await get_personalized_model(
+        user_df=processed_user_df, catalog=catalog, user=user
     )
+    print(f"Loaded {user}'s personalized recommendation model")
 
+    # Gets prediction pool for user
     prediction_list = [
         prediction.replace("https://letterboxd.com", "")
         for prediction in prediction_list
     ]
-    mask = movie_data["url"].isin(prediction_list)
-    pool = movie_data.loc[mask].copy()
-    del processed_user_df, merged, movie_data
+    prediction_rows = catalog.get_rows_by_url(urls=prediction_list)
+    pool = catalog.frame.iloc[np.unique(prediction_rows[prediction_rows >= 0])].copy()
+    del processed_user_df
     gc.collect()
 
     if len(pool) == 0:
         print("No data available for selected movies", file=sys.stderr)
         raise PredictionListException("No data available for selected movies")
 
-    # Prepares pool feature data
-    X_pool = prepare_personalized_features(X=pool)
+    # Gathers pool feature data
+    X_pool = catalog.get_features(row_ids=pool["row_id"])
 
     # Predicts user ratings for pool movies
-    predicted_ratings = model.predict(X_pool)
+    general_scores = await asyncio.to_thread(
+        get_catalog_general_scores, model=model, catalog=catalog, row_ids=pool["row_id"]
+    )
+    predicted_ratings = await run_in_worker(
+        predict_personalized, model=model, X=X_pool, general_scores=general_scores
+    )
     del X_pool
     gc.collect()
 
-    # Trims predicted ratings to acceptable range
-    pool["predicted_rating"] = np.clip(predicted_ratings, 0.5, 5).astype("float32")
-
-    # Rounds predicted ratings to 2 decimals
-    pool["predicted_rating"] = pool["predicted_rating"].apply(
-        lambda x: "{:.2f}".format(round(x, 2))
+    # Ranks predictions from highest to lowest predicted rating
+    predictions = rank_top_k(
+        pool=pool, predicted_ratings=predicted_ratings, k=len(pool)
     )
 
-    # Sorts predictions from highest to lowest predicted rating
-    predictions = pool.sort_values(
-        by="predicted_rating", ascending=False
-    ).drop_duplicates(subset=["title", "release_year", "runtime"])[
-        ["title", "poster", "release_year", "predicted_rating", "url"]
-    ]
-
     return {"username": user, "predictions": predictions}
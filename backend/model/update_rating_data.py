@@ -47,7 +47,7 @@ if __name__ == "__main__":
     start = time.perf_counter()
 
     # Loads user ratings
-    user_ratings = database.get_user_ratings()
+    user_ratings = database.load_user_ratings_table()
 
     # Updates user ratings
     user_ratings.to_csv(
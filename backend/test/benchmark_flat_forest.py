@@ -0,0 +1,65 @@
+import argparse
+import numpy as np
+import os
+import sys
+import time
+
+project_root = os.path.dirname((os.path.join(os.path.dirname(__file__), "../..")))
+sys.path.append(project_root)
+
+from model.flat_forest import FlatForest
+from model.general_model import get_general_model
+
+
+def time_predict(predict, X: np.ndarray, repeats: int) -> float:
+    """
+    Gets the best wall time of a prediction function.
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict(X)
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+
+    # Repeats
+    parser.add_argument(
+        "-r",
+        "--repeats",
+        type=int,
+        default=3,
+        help="Number of timed predictions per evaluator.",
+    )
+
+    # Pool sizes
+    parser.add_argument(
+        "-s",
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[96, 5000, 50000],
+        help="Numbers of movies scored.",
+    )
+
+    args = parser.parse_args()
+
+    model = get_general_model()
+    flat_forest = FlatForest(trees=model.estimators_)
+
+    # Compares scikit-learn and flat-array evaluation of the general model
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        X = rng.normal(0, 100, (size, model.n_features_in_)).astype("float32")
+        assert np.array_equal(flat_forest.predict(X), model.predict(X))
+
+        forest_time = time_predict(predict=model.predict, X=X, repeats=args.repeats)
+        flat_time = time_predict(predict=flat_forest.predict, X=X, repeats=args.repeats)
+
+        print(f"scikit-learn scored {size} movies in {forest_time} seconds")
+        print(f"Flat forest scored {size} movies in {flat_time} seconds")
@@ -0,0 +1,49 @@
+import argparse
+import os
+import sys
+import time
+
+project_root = os.path.dirname((os.path.join(os.path.dirname(__file__), "../..")))
+sys.path.append(project_root)
+
+from data_processing import database
+
+
+def time_loader(loader, repeats: int) -> float:
+    """
+    Gets the best wall time of a loader.
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        loader()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+
+    # Repeats
+    parser.add_argument(
+        "-r",
+        "--repeats",
+        type=int,
+        default=3,
+        help="Number of timed loads per loader.",
+    )
+
+    args = parser.parse_args()
+
+    # Compares the text and binary COPY loaders
+    csv_time = time_loader(
+        loader=database.load_movie_data_table_csv, repeats=args.repeats
+    )
+    binary_time = time_loader(
+        loader=database.load_movie_data_table, repeats=args.repeats
+    )
+
+    print(f"CSV COPY loaded movie data in {csv_time} seconds")
+    print(f"Binary COPY loaded movie data in {binary_time} seconds")
@@ -5,7 +5,8 @@ import os
 import pandas as pd
 import seaborn as sns
 import sys
-from typing import Literal, Tuple
+import time
+from typing import Literal, Sequence, Tuple
 
 project_root = os.path.dirname((os.path.join(os.path.dirname(__file__), "../..")))
 sys.path.append(project_root)
@@ -13,7 +14,11 @@ sys.path.append(project_root)
 from data_processing.utils import (
     get_processed_user_df,
 )
-from model.personalized_model import train_personalized_model
+from model.personalized_model import (
+    MAX_TRAINING_RATINGS,
+    PERSONALIZED_MODEL_TIERS,
+    train_personalized_model,
+)
 
 
 async def evaluate_model(
@@ -41,6 +46,63 @@ async def evaluate_model(
     )
 
 
+async def benchmark_tiers(user: str) -> Sequence[Tuple[int, str, float, float, float]]:
+    """
+    Benchmarks the training latency and accuracy of each personalized model tier.
+    """
+
+    # Loads processed user df, unrated movies, and movie catalog
+    processed_user_df, _, catalog = await get_processed_user_df(
+        user=user, update_urls=False
+    )
+    features = catalog.get_features(row_ids=processed_user_df["row_id"])
+
+    # Trains each tier on the same splits
+    results = []
+    for tier in PERSONALIZED_MODEL_TIERS:
+        start = time.perf_counter()
+        _, rmse_test, _, rmse_val, _ = train_personalized_model(
+            user_df=processed_user_df, features=features, tier=tier
+        )
+        finish = time.perf_counter()
+
+        results.append(
+            (len(processed_user_df), tier, finish - start, rmse_test, rmse_val)
+        )
+
+    return results
+
+
+async def benchmark_sampling(
+    user: str,
+) -> Sequence[Tuple[int, int | None, float, float, float]]:
+    """
+    Benchmarks the training latency and accuracy of capping the training
+    ratings with stratified sampling.
+    """
+
+    # Loads processed user df, unrated movies, and movie catalog
+    processed_user_df, _, catalog = await get_processed_user_df(
+        user=user, update_urls=False
+    )
+    features = catalog.get_features(row_ids=processed_user_df["row_id"])
+
+    # Trains with each cap on the same splits
+    results = []
+    for max_ratings in [None, MAX_TRAINING_RATINGS, MAX_TRAINING_RATINGS // 3]:
+        start = time.perf_counter()
+        _, rmse_test, _, rmse_val, _ = train_personalized_model(
+            user_df=processed_user_df, features=features, max_ratings=max_ratings
+        )
+        finish = time.perf_counter()
+
+        results.append(
+            (len(processed_user_df), max_ratings, finish - start, rmse_test, rmse_val)
+        )
+
+    return results
+
+
 def plot_rmse_values(
     accuracy_df: pd.DataFrame,
     model_type: Literal["personalized", "collaborative"],
@@ -83,10 +145,45 @@ def plot_rmse_values(
 async def main(
     users: str,
     model_type: Literal["personalized", "collaborative"],
+    tiers: bool = False,
+    sampling: bool = False,
 ) -> None:
 
     user_list = users.split(",")
 
+    # Benchmarks personalized model tiers
+    if tiers:
+        results = await asyncio.gather(
+            *[benchmark_tiers(user=user) for user in user_list]
+        )
+        tier_df = pd.DataFrame(
+            [row for rows in results for row in rows],
+            columns=["num_rated", "tier", "train_seconds", "rmse_test", "rmse_val"],
+        ).sort_values(by=["num_rated", "tier"])
+        print(tier_df.to_string(index=False))
+        print(
+            tier_df.groupby("tier")[["train_seconds", "rmse_test", "rmse_val"]].mean()
+        )
+        return
+
+    # Benchmarks stratified sampling of training ratings
+    if sampling:
+        results = await asyncio.gather(
+            *[benchmark_sampling(user=user) for user in user_list]
+        )
+        sampling_df = pd.DataFrame(
+            [row for rows in results for row in rows],
+            columns=[
+                "num_rated",
+                "max_ratings",
+                "train_seconds",
+                "rmse_test",
+                "rmse_val",
+            ],
+        )
+        print(sampling_df.to_string(index=False))
+        return
+
     # Evaluates  model
     tasks = [evaluate_model(user=user, model_type=model_type) for user in user_list]
     metrics = await asyncio.gather(*tasks)
@@ -126,6 +223,29 @@ if __name__ == "__main__":
         help="The users on whom the model is evaluated. If including multiple users, format the input as a single comma-delimited string.",
     )
 
+    # Tier benchmark
+    parser.add_argument(
+        "-t",
+        "--tiers",
+        action="store_true",
+        help="Benchmark the training latency and RMSE of each personalized model tier.",
+    )
+
+    # Sampling benchmark
+    parser.add_argument(
+        "-s",
+        "--sampling",
+        action="store_true",
+        help="Benchmark the training latency and RMSE of capping training ratings.",
+    )
+
     args = parser.parse_args()
 
-    asyncio.run(main(users=args.users, model_type=args.model_type))
+    asyncio.run(
+        main(
+            users=args.users,
+            model_type=args.model_type,
+            tiers=args.tiers,
+            sampling=args.sampling,
+        )
+    )
@@ -0,0 +1,53 @@
+import numpy as np
+import os
+import pandas as pd
+import sys
+from sklearn.ensemble import RandomForestRegressor
+
+project_root = os.path.dirname((os.path.join(os.path.dirname(__file__), "../..")))
+sys.path.append(project_root)
+
+from model import anytime_prediction
+from model.anytime_prediction import predict_anytime
+
+
+class TestAnytimePrediction:
+    """
+    Tests anytime prediction over tree ensembles.
+    """
+
+    def test_full_ensemble_matches_predict(self, monkeypatch) -> None:
+        """
+        Tests that scoring every tree matches the forest's predictions.
+        """
+        monkeypatch.setattr(anytime_prediction, "STABLE_BATCHES", 100)
+        rng = np.random.default_rng(0)
+        X = pd.DataFrame(rng.uniform(0, 1, (500, 5)))
+        model = RandomForestRegressor(n_estimators=35, random_state=0).fit(
+            X, rng.uniform(0.5, 5, 500)
+        )
+
+        scores = predict_anytime(model=model, X=X, k=10, budget=60)
+
+        assert np.allclose(scores, model.predict(X))
+
+    def test_budget_returns_partial_ensemble(self) -> None:
+        """
+        Tests that an exhausted budget returns the average of the scored trees.
+        """
+        rng = np.random.default_rng(0)
+        X = pd.DataFrame(rng.uniform(0, 1, (500, 5)))
+        model = RandomForestRegressor(n_estimators=35, random_state=0).fit(
+            X, rng.uniform(0.5, 5, 500)
+        )
+
+        scores = predict_anytime(model=model, X=X, k=10, budget=0)
+        partial = np.mean(
+            [
+                tree.predict(X.to_numpy(dtype="float32"))
+                for tree in model.estimators_[:10]
+            ],
+            axis=0,
+        )
+
+        assert np.allclose(scores, partial)
@@ -0,0 +1,84 @@
+import numpy as np
+import os
+import pytest
+import struct
+import sys
+
+project_root = os.path.dirname((os.path.join(os.path.dirname(__file__), "../..")))
+sys.path.append(project_root)
+
+from data_processing.binary_copy import (
+    BINARY_COPY_SIGNATURE,
+    build_string_array,
+    decode_binary_copy_rows,
+    decode_binary_copy_value,
+)
+
+
+def encode_binary_copy(rows: list[list[bytes | None]]) -> bytes:
+    """
+    Encodes rows of raw field values in the Postgres binary COPY format.
+    """
+    data = BINARY_COPY_SIGNATURE + struct.pack(">ii", 0, 0)
+    for row in rows:
+        data += struct.pack(">h", len(row))
+        for value in row:
+            if value is None:
+                data += struct.pack(">i", -1)
+            else:
+                data += struct.pack(">i", len(value)) + value
+
+    return data + struct.pack(">h", -1)
+
+
+class TestBinaryCopy:
+    """
+    Tests the binary COPY decoder.
+    """
+
+    def test_decode_rows(self) -> None:
+        """
+        Tests that fixed-width rows decode into typed columns.
+        """
+        data = encode_binary_copy(
+            [
+                [struct.pack(">i", 7), struct.pack(">d", 3.5), struct.pack(">h", 1999)],
+                [
+                    struct.pack(">i", 9),
+                    struct.pack(">d", np.nan),
+                    struct.pack(">h", 2020),
+                ],
+            ]
+        )
+        columns = decode_binary_copy_rows(
+            data=data,
+            dtypes={"movie_id": "int32", "rating": "float64", "year": "int16"},
+        )
+
+        assert columns["movie_id"].tolist() == [7, 9]
+        assert columns["rating"][0] == 3.5 and np.isnan(columns["rating"][1])
+        assert columns["year"].dtype == np.int16
+
+    def test_decode_rows_rejects_nulls(self) -> None:
+        """
+        Tests that a null in a fixed-width column is rejected.
+        """
+        data = encode_binary_copy([[struct.pack(">i", 7)], [None]])
+
+        with pytest.raises(ValueError):
+            decode_binary_copy_rows(data=data, dtypes={"movie_id": "int32"})
+
+    def test_build_string_array(self) -> None:
+        """
+        Tests that concatenated string values are split by their lengths.
+        """
+        values = ["Amélie", None, "", "Tokyo Story"]
+        encoded = [value.encode() for value in values if value is not None]
+        data = encode_binary_copy([[b"".join(encoded)]])
+        lengths = np.array(
+            [-1 if value is None else len(value.encode()) for value in values]
+        )
+
+        array = build_string_array(lengths=lengths, data=decode_binary_copy_value(data))
+
+        assert array.to_pylist() == values
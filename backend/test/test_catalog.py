@@ -0,0 +1,309 @@
+import functools
+import numpy as np
+import os
+import pandas as pd
+import pytest
+import sys
+
+project_root = os.path.dirname((os.path.join(os.path.dirname(__file__), "../..")))
+sys.path.append(project_root)
+
+from data_processing import catalog as catalog_module
+from data_processing.catalog import (
+    apply_catalog_delta,
+    build_catalog_table,
+    MovieCatalog,
+    read_catalog_snapshot,
+    write_catalog_snapshot,
+)
+from data_processing.utils import FEATURE_COLUMNS, get_genre_mask
+from model import general_model
+from model.model_cache import clear_model_cache, get_shared_scores
+from model.personalized_model import prepare_personalized_features
+
+
+@pytest.fixture
+def movie_data() -> pd.DataFrame:
+    """
+    Creates raw movie data in the database format.
+    """
+    return pd.DataFrame(
+        {
+            "movie_id": [10, 20, 30],
+            "url": ["/film/a/", "/film/b/", "/film/c/"],
+            "title": ["A", "B", "C"],
+            "content_type": ["movie", "tv", "movie"],
+            "release_year": [1999, 2010, 1975],
+            "runtime": [120, 45, 95],
+            "letterboxd_rating": [3.9, 3.1, np.nan],
+            "letterboxd_rating_count": [150000, 20000, 800],
+            "genres": [0b1000000000000000001, 0b0010010000000000000, 0],
+            "country_of_origin": [0, 1, 15],
+            "poster": ["p1", "p2", "p3"],
+        }
+    )
+
+
+class TestMovieCatalog:
+    """
+    Tests the columnar movie catalog.
+    """
+
+    def test_snapshot_round_trip(self, movie_data: pd.DataFrame, tmp_path) -> None:
+        """
+        Tests that the memory-mapped snapshot matches the raw movie data.
+        """
+        path = os.path.join(tmp_path, "movie_catalog.arrow")
+        write_catalog_snapshot(table=build_catalog_table(movie_data.copy()), path=path)
+        catalog = MovieCatalog(table=read_catalog_snapshot(path=path))
+
+        assert len(catalog) == 3
+        assert catalog.frame["url"].tolist() == movie_data["url"].tolist()
+        assert catalog.frame["release_year"].dtype == np.int16
+        assert np.isnan(catalog.frame["letterboxd_rating"].iloc[2])
+        assert catalog.frame[["is_action", "is_western"]].iloc[0].tolist() == [1, 1]
+        assert catalog.frame[["is_animation", "is_documentary"]].iloc[1].tolist() == [
+            1,
+            1,
+        ]
+
+    def test_genre_mask_matches_flags(self, movie_data: pd.DataFrame) -> None:
+        """
+        Tests that packed genre masks select the same movies as the genre flags.
+        """
+        catalog = MovieCatalog(table=build_catalog_table(movie_data.copy()))
+        packed_genres = catalog.frame["genres"].to_numpy()
+
+        for genres in [["action"], ["animation", "western"], ["drama"], []]:
+            expected = (
+                catalog.frame[[f"is_{genre}" for genre in genres]].any(axis=1)
+            ).to_numpy()
+            actual = (packed_genres & get_genre_mask(genres=genres)) != 0
+            assert actual.tolist() == expected.tolist()
+
+    def test_apply_catalog_delta(self, movie_data: pd.DataFrame) -> None:
+        """
+        Tests that a delta refresh upserts changed movies and advances the version.
+        """
+        movie_data["updated_at"] = "2025-01-01 00:00:00+00"
+        table = build_catalog_table(movie_data)
+
+        delta = movie_data.iloc[[1]].copy()
+        delta["letterboxd_rating"] = 3.4
+        delta["updated_at"] = "2025-02-01 00:00:00+00"
+        new_movie = movie_data.iloc[[0]].copy()
+        new_movie["movie_id"] = 40
+        new_movie["url"] = "/film/d/"
+        new_movie["updated_at"] = "2025-02-01 00:00:00+00"
+        catalog = MovieCatalog(
+            table=apply_catalog_delta(
+                table=table, movie_data=pd.concat([delta, new_movie])
+            )
+        )
+
+        assert sorted(catalog.frame["movie_id"].tolist()) == [10, 20, 30, 40]
+        assert catalog.frame.set_index("movie_id").loc[20, "letterboxd_rating"] == 3.4
+        assert catalog.updated_at.startswith("2025-02-01")
+
+    def test_unchanged_delta_keeps_table(self, movie_data: pd.DataFrame) -> None:
+        """
+        Tests that re-read updates of unchanged movies keep the catalog table and
+        never move its version back.
+        """
+        movie_data["updated_at"] = "2025-02-01 00:00:00+00"
+        table = build_catalog_table(movie_data)
+
+        reread = movie_data.copy()
+        reread["updated_at"] = "2025-01-31 23:55:00+00"
+        assert apply_catalog_delta(table=table, movie_data=reread) is table
+
+        late = movie_data.iloc[[2]].copy()
+        late["runtime"] = 100
+        late["updated_at"] = "2025-01-31 23:55:00+00"
+        catalog = MovieCatalog(table=apply_catalog_delta(table=table, movie_data=late))
+        assert catalog.frame.set_index("movie_id").loc[30, "runtime"] == 100
+        assert catalog.updated_at.startswith("2025-02-01")
+
+    def test_frame_is_read_only(self, movie_data: pd.DataFrame, tmp_path) -> None:
+        """
+        Tests that the catalog view cannot be modified in place.
+        """
+        path = os.path.join(tmp_path, "movie_catalog.arrow")
+        write_catalog_snapshot(table=build_catalog_table(movie_data.copy()), path=path)
+        catalog = MovieCatalog(table=read_catalog_snapshot(path=path))
+
+        with pytest.raises(ValueError):
+            catalog.frame["runtime"].to_numpy()[0] = 1
+
+    def test_filtered_rows_match_scan(self, movie_data: pd.DataFrame) -> None:
+        """
+        Tests that range index lookups select the same movies as a full scan.
+        """
+        catalog = MovieCatalog(table=build_catalog_table(movie_data.copy()))
+        frame = catalog.frame
+
+        for popularity, minimum_rating in [
+            (["low", "medium", "high"], 0),
+            (["high"], 3.5),
+            (["low"], 0),
+            ([], 0),
+        ]:
+            rows = catalog.get_filtered_rows(
+                ranges={
+                    "release_year": (1970, 2010),
+                    "runtime": (45, 120),
+                    "letterboxd_rating": (minimum_rating, None),
+                },
+                popularity=popularity,
+            )
+            popularity_mask = np.zeros(len(frame), dtype="bool")
+            for bucket, (low, high) in {
+                "low": (0, 25000),
+                "medium": (25001, 100000),
+                "high": (100001, np.inf),
+            }.items():
+                if bucket in popularity:
+                    popularity_mask |= (
+                        frame["letterboxd_rating_count"].between(low, high).to_numpy()
+                    )
+            expected = np.flatnonzero(
+                frame["release_year"].between(1970, 2010).to_numpy()
+                & frame["runtime"].between(45, 120).to_numpy()
+                & (frame["letterboxd_rating"] >= minimum_rating).to_numpy()
+                & popularity_mask
+            )
+            assert rows.tolist() == expected.tolist()
+
+    def test_row_lookups(self, movie_data: pd.DataFrame) -> None:
+        """
+        Tests that movie_id and url lookups map to catalog rows.
+        """
+        catalog = MovieCatalog(table=build_catalog_table(movie_data.copy()))
+
+        assert catalog.get_rows_by_movie_id(
+            movie_ids=[30, 10, 25, -1, 99]
+        ).tolist() == [
+            2,
+            0,
+            -1,
+            -1,
+            -1,
+        ]
+        assert catalog.get_rows_by_url(
+            urls=["/film/b/", "/film/z/", None]
+        ).tolist() == [
+            1,
+            -1,
+            -1,
+        ]
+
+    def test_canonical_ids(self, movie_data: pd.DataFrame) -> None:
+        """
+        Tests that movies with the same title, year, and runtime share an id.
+        """
+        duplicate = movie_data.iloc[[0]].copy()
+        duplicate["movie_id"] = 40
+        duplicate["url"] = "/film/a-1/"
+        catalog = MovieCatalog(
+            table=build_catalog_table(pd.concat([movie_data, duplicate]))
+        )
+
+        canonical_ids = catalog.frame["canonical_id"].tolist()
+        assert canonical_ids[0] == canonical_ids[3]
+        assert len(set(canonical_ids[:3])) == 3
+        assert catalog.num_canonical_ids == 3
+
+    def test_general_scores(self, movie_data: pd.DataFrame, monkeypatch) -> None:
+        """
+        Tests that general scores are predicted once for every catalog row.
+        """
+        catalog = MovieCatalog(table=build_catalog_table(movie_data.copy()))
+        calls = []
+
+        class GeneralModel:
+            def predict(self, X: pd.DataFrame) -> np.ndarray:
+                calls.append(len(X))
+                return X["release_year"].to_numpy() / 1000
+
+        monkeypatch.setattr(
+            general_model,
+            "get_versioned_general_model",
+            lambda: ("v1", GeneralModel()),
+        )
+
+        assert catalog.get_general_scores().tolist() == pytest.approx(
+            [1.999, 2.01, 1.975]
+        )
+        catalog.get_general_scores()
+        assert calls == [3]
+
+    def test_general_scores_shared_across_workers(
+        self, movie_data: pd.DataFrame, monkeypatch, tmp_path
+    ) -> None:
+        """
+        Tests that catalogs loaded from the same snapshot share one prediction
+        of the general scores.
+        """
+        path = os.path.join(tmp_path, "movie_catalog.arrow")
+        write_catalog_snapshot(table=build_catalog_table(movie_data.copy()), path=path)
+        calls = []
+
+        class GeneralModel:
+            def predict(self, X: pd.DataFrame) -> np.ndarray:
+                calls.append(len(X))
+                return X["release_year"].to_numpy() / 1000
+
+        monkeypatch.setattr(
+            general_model,
+            "get_versioned_general_model",
+            lambda: ("v1", GeneralModel()),
+        )
+        monkeypatch.setattr(
+            catalog_module,
+            "get_shared_scores",
+            functools.partial(get_shared_scores, path=tmp_path),
+        )
+        clear_model_cache()
+
+        # Simulates each worker process mapping the snapshot
+        for _ in range(2):
+            catalog = MovieCatalog(
+                table=read_catalog_snapshot(path=path),
+                snapshot_mtime=os.stat(path).st_mtime_ns,
+            )
+            assert catalog.get_general_scores().tolist() == pytest.approx(
+                [1.999, 2.01, 1.975]
+            )
+            clear_model_cache()
+        assert calls == [3]
+
+    def test_features_match_personalized_features(
+        self, movie_data: pd.DataFrame
+    ) -> None:
+        """
+        Tests that the precomputed feature matrix matches the features prepared
+        for the personalized model.
+        """
+        catalog = MovieCatalog(table=build_catalog_table(movie_data.copy()))
+
+        features = catalog.get_features(row_ids=np.arange(len(catalog)))
+        expected = prepare_personalized_features(X=catalog.frame)
+
+        assert features.columns.tolist() == list(FEATURE_COLUMNS)
+        for column in FEATURE_COLUMNS:
+            assert np.array_equal(
+                features[column].to_numpy(),
+                expected[column].to_numpy(dtype="float32"),
+                equal_nan=True,
+            ), column
+
+    def test_features_with_missing_content_type(self, movie_data: pd.DataFrame) -> None:
+        """
+        Tests that movies without a content type are built as non-movies.
+        """
+        movie_data["content_type"] = ["movie", None, "tv"]
+        catalog = MovieCatalog(table=build_catalog_table(movie_data))
+
+        features = catalog.get_features(row_ids=np.arange(len(catalog)))
+
+        assert features["is_movie"].tolist() == [1, 0, 0]
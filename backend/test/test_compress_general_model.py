@@ -0,0 +1,37 @@
+import os
+import pandas as pd
+import sys
+
+project_root = os.path.dirname((os.path.join(os.path.dirname(__file__), "../..")))
+sys.path.append(project_root)
+
+from model.general.compress_general_model import select_general_model_stage
+
+
+class TestCompressGeneralModel:
+    """
+    Tests the general model compression pipeline.
+    """
+
+    def test_selects_fastest_stage_within_tolerance(self) -> None:
+        """
+        Tests that the selected stage is the fastest one whose validation RMSE
+        is within the tolerance of the original model's.
+        """
+        report = pd.DataFrame(
+            {
+                "stage": ["original", "distilled", "pruned", "quantized"],
+                "latency_seconds": [3.0, 1.0, 0.89, 1.3],
+                "rmse_val": [0.8, 0.805, 0.809, 0.809],
+            }
+        ).set_index("stage")
+
+        assert select_general_model_stage(report=report) == "pruned"
+        assert (
+            select_general_model_stage(report=report, rmse_tolerance=0.006)
+            == "distilled"
+        )
+        assert (
+            select_general_model_stage(report=report, rmse_tolerance=0.001)
+            == "original"
+        )
@@ -0,0 +1,50 @@
+import os
+import sys
+import threading
+import time
+
+project_root = os.path.dirname((os.path.join(os.path.dirname(__file__), "../..")))
+sys.path.append(project_root)
+
+from infra import cpu_budget
+from infra.cpu_budget import release_threads, reserve_threads
+
+
+class TestCpuBudget:
+    """
+    Tests the CPU thread budget.
+    """
+
+    def test_allotments_split_budget_evenly(self, monkeypatch) -> None:
+        """
+        Tests that concurrent jobs split the budget evenly, never holding more
+        than CPU_THREADS threads.
+        """
+        monkeypatch.setattr(cpu_budget, "CPU_THREADS", 8)
+
+        first = reserve_threads()
+        assert first == 8
+        assert reserve_threads(blocking=False) == 0
+
+        # Starts jobs that wait for the first job's threads
+        allotments = []
+        jobs = [
+            threading.Thread(target=lambda: allotments.append(reserve_threads()))
+            for _ in range(4)
+        ]
+        for job in jobs:
+            job.start()
+        while cpu_budget._active_jobs < 5:
+            time.sleep(0.01)
+        assert allotments == []
+
+        release_threads(threads=first)
+        for job in jobs:
+            job.join(timeout=5)
+        assert allotments == [2, 2, 2, 2]
+        assert cpu_budget._allotted_threads == 8
+
+        for threads in allotments:
+            release_threads(threads=threads)
+        assert cpu_budget._active_jobs == 0
+        assert cpu_budget._allotted_threads == 0
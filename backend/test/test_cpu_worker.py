@@ -0,0 +1,68 @@
+import asyncio
+import os
+import pytest
+import sys
+import time
+
+project_root = os.path.dirname((os.path.join(os.path.dirname(__file__), "../..")))
+sys.path.append(project_root)
+
+from infra.cpu_worker import run_in_worker
+from infra.custom_exceptions import PredictionListException
+
+
+def get_pid() -> int:
+    """
+    Gets the id of the current process.
+    """
+    return os.getpid()
+
+
+def fail() -> None:
+    """
+    Raises an exception.
+    """
+    raise PredictionListException("No data available for selected movies")
+
+
+def write_after_sleep(path: str, seconds: float) -> None:
+    """
+    Writes a file after sleeping.
+    """
+    time.sleep(seconds)
+    with open(path, "w") as f:
+        f.write("done")
+
+
+class TestCpuWorker:
+    """
+    Tests running CPU-bound jobs in worker processes.
+    """
+
+    def test_returns_result(self) -> None:
+        """
+        Tests that jobs run outside the current process.
+        """
+        assert asyncio.run(run_in_worker(get_pid)) != os.getpid()
+        assert asyncio.run(run_in_worker(sum, [1, 2, 3])) == 6
+
+    def test_raises_job_exception(self) -> None:
+        """
+        Tests that job exceptions are raised to the caller.
+        """
+        with pytest.raises(PredictionListException):
+            asyncio.run(run_in_worker(fail))
+
+    def test_timeout_kills_worker(self, tmp_path) -> None:
+        """
+        Tests that a job is killed once its timeout expires.
+        """
+        path = os.path.join(tmp_path, "result")
+
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(
+                run_in_worker(write_after_sleep, path=path, seconds=1, timeout=0.2)
+            )
+        time.sleep(1.5)
+
+        assert not os.path.exists(path)
@@ -0,0 +1,78 @@
+import numpy as np
+import os
+import pandas as pd
+import sys
+from sklearn.ensemble import RandomForestRegressor
+
+project_root = os.path.dirname((os.path.join(os.path.dirname(__file__), "../..")))
+sys.path.append(project_root)
+
+from model.flat_forest import FlatForest, get_float32_thresholds
+
+
+class TestFlatForest:
+    """
+    Tests flat-array forest evaluation.
+    """
+
+    def test_predict_matches_forest(self) -> None:
+        """
+        Tests that flat predictions equal the forest's predictions exactly.
+        """
+        rng = np.random.default_rng(0)
+        X = pd.DataFrame(rng.normal(0, 100, (2000, 6)))
+        model = RandomForestRegressor(
+            n_estimators=30, max_depth=8, min_samples_split=10, random_state=0
+        ).fit(X, rng.uniform(0.5, 5, 2000))
+
+        X_test = rng.normal(0, 100, (3000, 6)).astype("float32")
+        flat_forest = FlatForest(trees=model.estimators_)
+
+        assert np.array_equal(flat_forest.predict(X_test), model.predict(X_test))
+
+    def test_missing_values_follow_forest(self) -> None:
+        """
+        Tests that missing values are routed as the forest routes them.
+        """
+        rng = np.random.default_rng(0)
+        X = rng.normal(0, 1, (1000, 4))
+        X[rng.uniform(0, 1, X.shape) < 0.2] = np.nan
+        model = RandomForestRegressor(n_estimators=10, random_state=0).fit(
+            X, rng.uniform(0.5, 5, 1000)
+        )
+
+        X_test = rng.normal(0, 1, (500, 4)).astype("float32")
+        X_test[rng.uniform(0, 1, X_test.shape) < 0.2] = np.nan
+        flat_forest = FlatForest(trees=model.estimators_)
+
+        assert np.array_equal(flat_forest.predict(X_test), model.predict(X_test))
+
+    def test_float32_thresholds_preserve_splits(self) -> None:
+        """
+        Tests that float32 thresholds split float32 values like the originals.
+        """
+        thresholds = np.array([0.1, 1.5, 2.0000001, -3.3])
+        values = np.array([0.1, 1.5, 2.0, 2.0000002, -3.3], dtype="float32")
+
+        rounded = get_float32_thresholds(thresholds=thresholds)
+
+        assert np.array_equal(
+            values[:, np.newaxis] <= rounded,
+            values[:, np.newaxis].astype("float64") <= thresholds,
+        )
+
+    def test_quantized_values_stay_close(self) -> None:
+        """
+        Tests that quantized leaf values keep predictions within float16 error.
+        """
+        rng = np.random.default_rng(0)
+        X = rng.normal(0, 1, (1000, 4))
+        model = RandomForestRegressor(n_estimators=10, random_state=0).fit(
+            X, rng.uniform(0.5, 5, 1000)
+        )
+
+        flat_forest = FlatForest(trees=model.estimators_)
+        flat_forest.quantize_values(dtype="float16")
+
+        assert flat_forest.values.dtype == np.float16
+        assert np.allclose(flat_forest.predict(X), model.predict(X), atol=5e-3)
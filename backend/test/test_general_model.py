@@ -0,0 +1,60 @@
+import numpy as np
+import os
+import sys
+from sklearn.ensemble import RandomForestRegressor
+
+project_root = os.path.dirname((os.path.join(os.path.dirname(__file__), "../..")))
+sys.path.append(project_root)
+
+from data_processing import catalog
+from model import general_model
+from model.general_model import (
+    get_versioned_general_model,
+    reload_general_model,
+    save_general_model,
+)
+
+
+class TestGeneralModelRegistry:
+    """
+    Tests loading and hot reloading the general model.
+    """
+
+    def test_reload_swaps_changed_model(self, tmp_path, monkeypatch) -> None:
+        """
+        Tests that reloads swap in changed models after scoring the catalog.
+        """
+        path = os.path.join(tmp_path, "general_model.pkl")
+        monkeypatch.setattr(general_model, "_general_model", None)
+        monkeypatch.setattr(general_model, "_watcher_pid", os.getpid())
+
+        scored = []
+
+        class MovieCatalog:
+            def score_general_model(self, version: str, model) -> None:
+                scored.append(version)
+
+        monkeypatch.setattr(catalog, "get_movie_catalog", MovieCatalog)
+
+        rng = np.random.default_rng(0)
+        X = rng.uniform(0, 1, (200, 3))
+        first = RandomForestRegressor(n_estimators=5, random_state=0)
+        second = RandomForestRegressor(n_estimators=5, random_state=1)
+
+        save_general_model(model=first.fit(X, rng.uniform(0.5, 5, 200)), save_path=path)
+        assert reload_general_model(load_path=path)
+        first_version, model = get_versioned_general_model()
+        assert np.array_equal(model.predict(X), first.predict(X))
+
+        # Keeps the loaded model when the deployed model is unchanged
+        assert not reload_general_model(load_path=path)
+
+        save_general_model(
+            model=second.fit(X, rng.uniform(0.5, 5, 200)), save_path=path
+        )
+        assert reload_general_model(load_path=path)
+        second_version, model = get_versioned_general_model()
+        assert np.array_equal(model.predict(X), second.predict(X))
+
+        assert first_version != second_version
+        assert scored == [first_version, second_version]
@@ -0,0 +1,100 @@
+import numpy as np
+import os
+import pandas as pd
+import sys
+
+project_root = os.path.dirname((os.path.join(os.path.dirname(__file__), "../..")))
+sys.path.append(project_root)
+
+from model import model_cache
+from model.model_cache import (
+    cache_model,
+    cache_scores,
+    clear_model_cache,
+    get_cached_model,
+    get_cached_scores,
+    get_model_cache_key,
+    get_shared_scores,
+)
+
+
+class TestModelCache:
+    """
+    Tests the personalized model cache.
+    """
+
+    def test_key_ignores_rating_order(self) -> None:
+        """
+        Tests that the cache key depends only on the set of ratings.
+        """
+        user_df = pd.DataFrame(
+            {"movie_id": [3, 1, 2], "user_rating": [4.5, 2.0, 3.0], "url": "x"}
+        )
+        shuffled = user_df.iloc[[2, 0, 1]]
+        changed = user_df.assign(user_rating=[4.5, 2.0, 3.5])
+
+        key = get_model_cache_key(user_df=user_df, model_version="1")
+        assert key == get_model_cache_key(user_df=shuffled, model_version="1")
+        assert key != get_model_cache_key(user_df=changed, model_version="1")
+        assert key != get_model_cache_key(user_df=user_df, model_version="2")
+
+    def test_memory_and_disk_cache(self, tmp_path, monkeypatch) -> None:
+        """
+        Tests that models are evicted from memory and reloaded from disk.
+        """
+        monkeypatch.setattr(model_cache, "MODEL_CACHE_SIZE", 1)
+        clear_model_cache()
+
+        cache_model(key="a", model={"model": "a"}, path=tmp_path)
+        cache_model(key="b", model={"model": "b"}, path=tmp_path)
+        assert list(model_cache._models) == ["b"]
+
+        assert get_cached_model(key="a", path=tmp_path) == {"model": "a"}
+        assert list(model_cache._models) == ["a"]
+        assert get_cached_model(key="c", path=tmp_path) is None
+
+        clear_model_cache()
+
+    def test_scores_cache(self, tmp_path, monkeypatch) -> None:
+        """
+        Tests that scored catalogs are evicted from memory and memory-mapped
+        from disk.
+        """
+        monkeypatch.setattr(model_cache, "SCORE_CACHE_SIZE", 1)
+        clear_model_cache()
+
+        scores = np.linspace(0.5, 5, 10, dtype="float32")
+        cache_scores(key="a", scores=scores, path=tmp_path)
+        cache_scores(key="b", scores=scores[::-1], path=tmp_path)
+        assert list(model_cache._scores) == ["b"]
+
+        cached = get_cached_scores(key="a", path=tmp_path)
+        assert isinstance(cached, np.memmap)
+        assert np.array_equal(cached, scores)
+        assert get_cached_scores(key="c", path=tmp_path) is None
+
+        clear_model_cache()
+
+    def test_shared_scores(self, tmp_path) -> None:
+        """
+        Tests that shared scores are computed once and memory-mapped by other
+        workers.
+        """
+        clear_model_cache()
+        calls = []
+
+        def score() -> np.ndarray:
+            calls.append(1)
+            return np.arange(5, dtype="float64")
+
+        scores = get_shared_scores(key="general", score=score, path=tmp_path)
+        assert np.array_equal(scores, np.arange(5))
+
+        # Simulates another worker process with an empty in-memory cache
+        clear_model_cache()
+        shared = get_shared_scores(key="general", score=score, path=tmp_path)
+        assert isinstance(shared, np.memmap)
+        assert np.array_equal(shared, scores)
+        assert calls == [1]
+
+        clear_model_cache()
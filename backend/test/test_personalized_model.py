@@ -0,0 +1,279 @@
+import asyncio
+import functools
+import numpy as np
+import os
+import pandas as pd
+import pickle
+from sklearn.linear_model import LinearRegression
+from sklearn.tree import DecisionTreeRegressor
+import sys
+import time
+
+project_root = os.path.dirname((os.path.join(os.path.dirname(__file__), "../..")))
+sys.path.append(project_root)
+
+from data_processing.catalog import build_catalog_table, MovieCatalog
+from data_processing.utils import FEATURE_COLUMNS
+from model import personalized_model
+from model.model_cache import (
+    cache_model,
+    cache_scores,
+    clear_model_cache,
+    get_cached_model,
+    get_cached_scores,
+    get_rating_pairs,
+)
+from model.personalized_model import (
+    can_update_personalized_model,
+    fit_personalized_model,
+    get_personalized_model_tier,
+    get_personalized_model_version,
+    get_personalized_scores,
+    ResidualModel,
+    sample_training_rows,
+    update_personalized_model,
+)
+
+
+class TestPersonalizedModel:
+    """
+    Tests the personalized model.
+    """
+
+    def test_tiers_grow_with_profile_size(self) -> None:
+        """
+        Tests that larger profiles get larger model tiers.
+        """
+        assert get_personalized_model_tier(num_ratings=5) == "ridge"
+        assert get_personalized_model_tier(num_ratings=50) == "residual_forest"
+        assert get_personalized_model_tier(num_ratings=400) == "medium_forest"
+        assert get_personalized_model_tier(num_ratings=6000) == "large_forest"
+
+    def test_only_residual_versions_include_general_model(self, monkeypatch) -> None:
+        """
+        Tests that only residual models are versioned by the general model, so
+        other tiers survive general model reloads and a missing general model.
+        """
+
+        def get_missing_general_model() -> None:
+            raise ValueError("General model is missing")
+
+        monkeypatch.setattr(
+            personalized_model,
+            "get_versioned_general_model",
+            get_missing_general_model,
+        )
+        assert get_personalized_model_version(num_ratings=5) == (
+            personalized_model.PERSONALIZED_MODEL_VERSION
+        )
+        assert get_personalized_model_version(num_ratings=400) == (
+            personalized_model.PERSONALIZED_MODEL_VERSION
+        )
+
+        monkeypatch.setattr(
+            personalized_model,
+            "get_versioned_general_model",
+            lambda: ("general", None),
+        )
+        assert get_personalized_model_version(num_ratings=50) == (
+            f"{personalized_model.PERSONALIZED_MODEL_VERSION}-general"
+        )
+
+    def test_small_profile_handles_missing_ratings(self) -> None:
+        """
+        Tests that the smallest tier trains and predicts with missing features.
+        """
+        rng = np.random.default_rng(0)
+        features = pd.DataFrame(
+            rng.uniform(0, 5, (10, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS
+        )
+        features.loc[0, "letterboxd_rating"] = np.nan
+        user_df = pd.DataFrame({"user_rating": rng.uniform(0.5, 5, 10)})
+
+        model = fit_personalized_model(user_df=user_df, features=features)
+
+        assert np.isfinite(model.predict(features)).all()
+
+    def test_sample_training_rows_is_stratified(self) -> None:
+        """
+        Tests that capped training samples keep the rating distribution.
+        """
+        rng = np.random.default_rng(0)
+        num_ratings = 10000
+        X = pd.DataFrame({"release_year": rng.integers(1950, 2025, num_ratings)})
+        y = pd.Series(rng.choice([1.0, 3.0, 4.5], num_ratings, p=[0.1, 0.3, 0.6]))
+
+        rows = sample_training_rows(X=X, y=y, max_ratings=1000)
+
+        assert len(rows) == 1000
+        assert len(np.unique(rows)) == 1000
+        assert np.allclose(
+            y.iloc[rows].value_counts(normalize=True).sort_index(),
+            y.value_counts(normalize=True).sort_index(),
+            atol=0.005,
+        )
+        assert len(sample_training_rows(X=X, y=y, max_ratings=None)) == num_ratings
+
+    def test_residual_model_corrects_general_model(self, monkeypatch) -> None:
+        """
+        Tests that the residual model adds the user's residuals to the general
+        model's predictions without storing the general model.
+        """
+        rng = np.random.default_rng(0)
+        X = pd.DataFrame(
+            rng.uniform(0, 5, (200, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS
+        )
+        general_model = LinearRegression().fit(X, X["letterboxd_rating"])
+        monkeypatch.setattr(
+            personalized_model, "get_general_model", lambda: general_model
+        )
+        y = X["letterboxd_rating"] + 0.5 * (X["is_drama"] > 2.5)
+
+        model = ResidualModel(
+            residual_model=DecisionTreeRegressor(max_depth=1, random_state=0)
+        ).fit(X, y)
+
+        assert np.allclose(model.predict(X), y)
+        assert b"LinearRegression" not in pickle.dumps(model)
+
+    def test_residual_model_uses_catalog_scores(self, monkeypatch) -> None:
+        """
+        Tests that the residual model corrects precomputed general scores and
+        only predicts with the general model for rows without a score.
+        """
+        rng = np.random.default_rng(0)
+        X = pd.DataFrame(
+            rng.uniform(0, 5, (200, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS
+        )
+        general_model = LinearRegression().fit(X, X["letterboxd_rating"])
+        predicted_rows = []
+
+        class CountingModel:
+            def predict(self, X: pd.DataFrame) -> np.ndarray:
+                predicted_rows.append(len(X))
+                return general_model.predict(X)
+
+        monkeypatch.setattr(
+            personalized_model, "get_general_model", lambda: CountingModel()
+        )
+        general_scores = general_model.predict(X)
+        y = X["letterboxd_rating"] + 0.5 * (X["is_drama"] > 2.5)
+
+        model = ResidualModel(
+            residual_model=DecisionTreeRegressor(max_depth=1, random_state=0)
+        ).fit(X, y, general_scores=general_scores)
+        assert predicted_rows == []
+        assert np.allclose(model.predict(X, general_scores=general_scores), y)
+        assert predicted_rows == []
+
+        general_scores[:3] = np.nan
+        assert np.allclose(model.predict(X, general_scores=general_scores), y)
+        assert predicted_rows == [3]
+
+    def test_incremental_update_adds_trees(self) -> None:
+        """
+        Tests that a few new ratings grow a copy of the cached forest, while
+        removed ratings and large drift require retraining.
+        """
+        rng = np.random.default_rng(0)
+        num_ratings = 400
+        features = pd.DataFrame(
+            rng.uniform(0, 5, (num_ratings, len(FEATURE_COLUMNS))),
+            columns=FEATURE_COLUMNS,
+        )
+        user_df = pd.DataFrame(
+            {
+                "movie_id": np.arange(num_ratings),
+                "user_rating": rng.uniform(0.5, 5, num_ratings),
+            }
+        )
+        previous_df = user_df.iloc[:390]
+        model = fit_personalized_model(
+            user_df=previous_df, features=features.iloc[:390]
+        )
+        previous_ratings = get_rating_pairs(user_df=previous_df)
+
+        assert can_update_personalized_model(
+            model=model, previous_ratings=previous_ratings, user_df=user_df
+        )
+        updated = update_personalized_model(
+            model=model, user_df=user_df, features=features
+        )
+        assert len(updated.estimators_) == len(model.estimators_) + 10
+        assert updated.estimators_[0] is not model.estimators_[0]
+
+        assert not can_update_personalized_model(
+            model=model, previous_ratings=previous_ratings, user_df=user_df.iloc[1:]
+        )
+        assert not can_update_personalized_model(
+            model=model,
+            previous_ratings=get_rating_pairs(user_df=user_df.iloc[:300]),
+            user_df=user_df,
+        )
+
+    def test_cold_scores_are_cached_in_background(self, monkeypatch, tmp_path) -> None:
+        """
+        Tests that uncached requests score only their rows while the whole
+        catalog is scored and cached in the background.
+        """
+        rng = np.random.default_rng(0)
+        num_movies = 30
+        catalog = MovieCatalog(
+            table=build_catalog_table(
+                pd.DataFrame(
+                    {
+                        "movie_id": np.arange(num_movies),
+                        "url": [f"/film/{i}/" for i in range(num_movies)],
+                        "title": [f"{i}" for i in range(num_movies)],
+                        "content_type": "movie",
+                        "release_year": rng.integers(1950, 2025, num_movies),
+                        "runtime": rng.integers(80, 180, num_movies),
+                        "letterboxd_rating": rng.uniform(1, 5, num_movies),
+                        "letterboxd_rating_count": rng.integers(1, 1e5, num_movies),
+                        "genres": rng.integers(0, 2**19, num_movies),
+                        "country_of_origin": rng.integers(0, 20, num_movies),
+                        "poster": "",
+                    }
+                )
+            )
+        )
+        user_df = pd.DataFrame(
+            {
+                "movie_id": np.arange(10),
+                "user_rating": rng.uniform(0.5, 5, 10),
+                "row_id": np.arange(10),
+            }
+        )
+        for function in [cache_model, cache_scores, get_cached_model]:
+            monkeypatch.setattr(
+                personalized_model,
+                function.__name__,
+                functools.partial(function, path=tmp_path),
+            )
+        cached_scores = functools.partial(get_cached_scores, path=tmp_path)
+        monkeypatch.setattr(personalized_model, "get_cached_scores", cached_scores)
+        clear_model_cache()
+
+        row_ids = np.arange(20, 30)
+        scores = asyncio.run(
+            get_personalized_scores(
+                user_df=user_df, catalog=catalog, row_ids=row_ids, k=3
+            )
+        )
+        assert len(scores) == len(row_ids)
+
+        # Waits for the background scoring of the whole catalog
+        deadline = time.monotonic() + 60
+        while personalized_model._scoring_keys and time.monotonic() < deadline:
+            time.sleep(0.05)
+        clear_model_cache()
+        assert len(list(tmp_path.glob("scores/*.npy"))) == 1
+
+        cached = asyncio.run(
+            get_personalized_scores(
+                user_df=user_df, catalog=catalog, row_ids=row_ids, k=3
+            )
+        )
+        assert np.allclose(cached, scores, atol=1e-5)
+
+        clear_model_cache()
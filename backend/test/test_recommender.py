@@ -0,0 +1,54 @@
+import numpy as np
+import os
+import pandas as pd
+import sys
+
+project_root = os.path.dirname((os.path.join(os.path.dirname(__file__), "../..")))
+sys.path.append(project_root)
+
+from model.recommender import rank_top_k
+
+
+class TestRanking:
+    """
+    Tests ranking of predicted ratings.
+    """
+
+    def test_rank_top_k_matches_full_sort(self) -> None:
+        """
+        Tests that top-k selection matches a full sort with duplicate removal.
+        """
+        rng = np.random.default_rng(0)
+        num_movies = 1000
+        pool = pd.DataFrame(
+            {
+                "title": [f"Movie {i}" for i in range(num_movies)],
+                "poster": "poster",
+                "release_year": 2000,
+                "url": [f"/film/{i}/" for i in range(num_movies)],
+                "canonical_id": rng.integers(0, 300, num_movies),
+            }
+        )
+        predicted_ratings = rng.uniform(0.5, 5, num_movies)
+
+        for k in [1, 10, 96, 500]:
+            top_k = rank_top_k(pool=pool, predicted_ratings=predicted_ratings, k=k)
+
+            scores = np.clip(predicted_ratings, 0.5, 5).astype("float32")
+            expected = (
+                pool.assign(score=scores)
+                .sort_values(by="score", ascending=False, kind="stable")
+                .drop_duplicates(subset="canonical_id")
+                .iloc[:k]
+            )
+            assert top_k["url"].tolist() == expected["url"].tolist()
+            assert top_k["predicted_rating"].tolist() == [
+                "{:.2f}".format(round(x, 2)) for x in expected["score"].tolist()
+            ]
+            assert top_k.columns.tolist() == [
+                "title",
+                "poster",
+                "release_year",
+                "predicted_rating",
+                "url",
+            ]
@@ -7,6 +7,7 @@ import sys
 project_root = os.path.dirname((os.path.join(os.path.dirname(__file__), "../..")))
 sys.path.append(project_root)
 
+from infra.warmup import warm_up
 from main import app
 
 
@@ -467,3 +468,16 @@ class TestOther:
         )
 
         assert response.status_code == 200
+
+    def test_ready(self, client: FlaskClient) -> None:
+        """
+        Tests the readiness route after the server warms up.
+        """
+        warm_up()
+
+        response = client.get(
+            "/api/ready",
+            content_type="application/json",
+        )
+
+        assert response.status_code == 200